@@ -19,12 +19,26 @@ def _getenv(key: str, default=None, cast=None):
 # ─────────────────────────────────────────────────────────
 # 인덱서/크롤러 기본값
 EMBED_MODEL_ID        = _getenv("EMBED_MODEL_ID",        "intfloat/e5-large-v2")
+EMBED_BATCH_SIZE      = _getenv("EMBED_BATCH_SIZE",      64,   int)   # encode 배치 크기
+EMBED_MAX_SEQ_LEN     = _getenv("EMBED_MAX_SEQ_LEN",     0,    int)   # 토큰 길이 상한(0이면 모델 기본값)
+EMBED_FP16            = _getenv("EMBED_FP16",            1,    int) == 1  # CUDA에서 FP16 가중치 사용
+EMBED_ONNX_DIR        = _getenv("EMBED_ONNX_DIR",        "")          # INT8 ONNX 임베더 디렉터리(scripts/quantize_embedder.py)
 RERANK_MODEL_ID       = _getenv("RERANK_MODEL_ID",       "khoj-ai/mxbai-rerank-base-v1")
 RERANK_TOP_N          = _getenv("RERANK_TOP_N",          4,    int)   # ✅ 누락 보강
+RERANK_CACHE_SIZE     = _getenv("RERANK_CACHE_SIZE",     4096, int)   # (질의, 문서) 점수 LRU 크기
 INDEX_DIR             = _getenv("INDEX_DIR",             "app/data/index.faiss")
 RETRIEVER_K           = _getenv("RETRIEVER_K",           12,   int)
 VEC_WEIGHT            = _getenv("VEC_WEIGHT",            0.7,  float)
 BM25_WEIGHT           = _getenv("BM25_WEIGHT",           0.3,  float)
+HNSW_MIN_DOCS         = _getenv("HNSW_MIN_DOCS",         20000, int)  # 청크가 이보다 많으면 HNSW 인덱스로 빌드
+HNSW_M                = _getenv("HNSW_M",                32,   int)
+HNSW_EF_SEARCH        = _getenv("HNSW_EF_SEARCH",        64,   int)   # HNSW 검색 폭(재현율/지연 조절)
+FAISS_ANN             = _getenv("FAISS_ANN",             "hnsw")      # HNSW_MIN_DOCS 초과 시 근사 인덱스: hnsw | ivfpq
+IVF_NLIST             = _getenv("IVF_NLIST",             0,    int)   # IVF 군집 수(0이면 4·√N)
+IVF_NPROBE            = _getenv("IVF_NPROBE",            16,   int)   # IVF 검색 시 훑을 군집 수
+PQ_M                  = _getenv("PQ_M",                  16,   int)   # PQ 부분벡터 수(벡터당 바이트, 차원의 약수로 맞춤)
+FAISS_THREADS         = _getenv("FAISS_THREADS",         0,    int)   # 0이면 물리 코어 수
+FAISS_QUANT           = _getenv("FAISS_QUANT",           "none")      # 빌드 시 벡터 양자화: int8 | fp16 | none
 
 # 검색/퍼지 기본값
 SEARCH_HITS           = _getenv("SEARCH_HITS",           5,    int)
@@ -35,12 +49,17 @@ THRESH                = _getenv("THRESH",                0.5,  float) # 로컬 h
 # 캐시/Redis
 REDIS_URL             = _getenv("REDIS_URL",             "redis://localhost:6379/0")
 CACHE_TTL_SEC         = _getenv("CACHE_TTL_SEC",         600,  int)
+ANSWER_CACHE_SIZE     = _getenv("ANSWER_CACHE_SIZE",     1024, int)   # 프로세스 내 답변 LRU(질문 정확 일치)
+SEM_CACHE_SIZE        = _getenv("SEM_CACHE_SIZE",        0,    int)   # 의미 캐시 최대 질의 수(링 버퍼, 0이면 끔 — 임계값 검증 전까지 기본 끔)
+SEM_CACHE_SIM         = _getenv("SEM_CACHE_SIM",         0.95, float) # 의미 캐시 적중 코사인 유사도 하한
 
 # 런타임(OpenAI 등)
 OPENAI_API_KEY        = _getenv("OPENAI_API_KEY",        "")
 OPENAI_MODEL          = _getenv("OPENAI_MODEL",          "gpt-4o-mini")
 OPENAI_TEMPERATURE    = _getenv("OPENAI_TEMPERATURE",    0.2,  float)
 MAX_COMPLETION_TOKENS = _getenv("MAX_COMPLETION_TOKENS", 1024, int)
+WARM_START            = _getenv("WARM_START",            1,    int) == 1  # import 시 백그라운드로 임베더/인덱스/BM25 미리 로드
+WEB_PREFETCH          = _getenv("WEB_PREFETCH",          1,    int) == 1  # 로컬 검색이 약하면 FAQ/퍼지 단계와 동시에 웹 검색 미리 시작
 
 LLAMA_API             = _getenv("LLAMA_API",             "")
 
@@ -56,6 +75,7 @@ RETRIEVER_TOPK   = RETRIEVER_K
 INDEX_PATH       = INDEX_DIR
 FAISS_INDEX_PATH = INDEX_DIR
 CLEAN_DIR = _getenv("CLEAN_DIR", "app/data/clean")
+EMB_CACHE_PATH = _getenv("EMB_CACHE_PATH", "app/data/emb_cache")  # 청크 임베딩 캐시(dbm)
 
 STATIC_URL_PREFIX = "/static"
 STATIC_DIR = str((Path(__file__).resolve().parent / "static").resolve())
@@ -92,6 +92,13 @@ try:
 except Exception:
     _EASY_AVAILABLE = False
 
+# 페이지 HTML 파서: lxml(C, requirements.txt)이 있으면 사용, 없으면 내장 html.parser(순수 파이썬)
+try:
+    import lxml  # type: ignore  # noqa: F401
+    _HTML_PARSER = "lxml"
+except Exception:
+    _HTML_PARSER = "html.parser"
+
 
 def _infer_paddle_lang(ocr_lang: str, explicit: Optional[str]) -> str:
     if explicit:
@@ -175,14 +182,17 @@ def page_id_from_path(path: str) -> Optional[str]:
     return m.group(1) if m else None
 
 # ────────────────────────────────────────────────────────────
+_CHROME_SELECTOR = ", ".join([
+    "nav","header","footer","aside","form","iframe","noscript",".gnb",".lnb",".breadcrumb",".breadcrumbs",".pagination",
+    ".pager",".skip",".sr-only",".sr_only",".sns",".share",".social",".banner",".ad",".advert",".visual",".btn",".btn-group",".btns",".actions",".toolbar",
+    "#gnb","#lnb","#footer","#header","#nav","#quick"
+])
+
 def strip_chrome(soup: BeautifulSoup) -> None:
-    selectors = [
-        "nav","header","footer","aside","form","iframe","noscript",".gnb",".lnb",".breadcrumb",".breadcrumbs",".pagination",
-        ".pager",".skip",".sr-only",".sr_only",".sns",".share",".social",".banner",".ad",".advert",".visual",".btn",".btn-group",".btns",".actions",".toolbar",
-        "#gnb","#lnb","#footer","#header","#nav","#quick"
-    ]
-    for sel in selectors:
-        for t in soup.select(sel):
+    # 선택자 하나로 묶어 트리를 한 번만 순회 (선택자마다 전체 순회하지 않음)
+    # 이미 지운 요소 안에 있던 요소는 건너뜀
+    for t in soup.select(_CHROME_SELECTOR):
+        if not t.decomposed:
             t.decompose()
     noise_keywords = ["뒤로","더보기","접기","열기","로그인","로그아웃","마이페이지","Alarm","공지사항","바로가기","TOP","맨위로","검색","내 글 반응","게시물 알림"]
     for a in list(soup.find_all(["a","button","span","div"])):
@@ -324,6 +334,7 @@ def _clean_phone(s: str) -> str:
     return s.strip("- ")
 
 def _html_to_markdown(tag: BeautifulSoup) -> str:
+    # 조각 복제는 html.parser로 (lxml은 조각에도 <html><body>를 씌움)
     clone = BeautifulSoup(str(tag), "html.parser")
     return html_to_markdown(clone)
 
@@ -833,7 +844,7 @@ async def crawl_internal_clean(category: str, seeds: List[str]):
             if status != 200 or not html:
                 return
 
-            soup = BeautifulSoup(html, "html.parser")
+            soup = BeautifulSoup(html, _HTML_PARSER)
             title = soup.title.get_text(strip=True) if soup.title else "제목없음"
             slug = slugify(title)
             pid = page_id_from_path(urlparse(nu).path)
@@ -865,7 +876,7 @@ async def save_external_once_clean(category: str, seeds: List[str]):
             status, html = await fetch_html(session, u)
             if status != 200 or not html:
                 continue
-            soup = BeautifulSoup(html, "html.parser")
+            soup = BeautifulSoup(html, _HTML_PARSER)
             title = soup.title.get_text(strip=True) if soup.title else urlparse(u).netloc
             slug = slugify(title)
             suf = hashlib.md5(u.encode()).hexdigest()[:8]
@@ -7,12 +7,15 @@ import html
 import json
 import os
 import re
-import textwrap
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+import numpy as np
+
 from zoneinfo import ZoneInfo
 KST = ZoneInfo("Asia/Seoul")
 TODAY = datetime.now(KST).date()
@@ -25,6 +28,7 @@ from rapidfuzz import fuzz, process
 from redis.asyncio import Redis
 
 from app.config import (
+    ANSWER_CACHE_SIZE,
     CACHE_TTL,
     DDG_HITS,
     FUZZ_LIMIT,
@@ -35,8 +39,13 @@ from app.config import (
     OPENAI_MODEL,
     OPENAI_TEMPERATURE,
     REDIS_URL,
+    SEM_CACHE_SIM,
+    SEM_CACHE_SIZE,
+    WARM_START,
+    WEB_PREFETCH,
     validate_runtime_env,
 )
+from app.rag.embeddings import get_embedder
 from app.rag.intent_classifier import classify_intent_and_entity
 from app.rag.prompt import PROMPT_FUSION, PROMPT_SINGLE, STYLE_GUIDE
 from app.rag.retriever import get_retriever, get_vectorstore
@@ -45,8 +54,11 @@ from app.rag.programs import (
     fuzzy_find_best_tag,
     get_program_by_alias,
     get_programs_by_tag,
+    scan_query,
 )
+from app.rag.textnorm import normalize_query
 from app.rag.faq import find_faq_answer
+from app.rag.matcher import KeywordMatcher
 
 # URL 라우터(사용자가 미리 매칭해 둔 링크)
 try:
@@ -161,6 +173,101 @@ async def _set_cached(key: str, val: str, ttl: int = CACHE_TTL):
         await _redis.set(key, val, ex=ttl)
 
 
+_NUM_RUN = re.compile(r"\d+")
+
+# 의미 캐시 항목: (질의 벡터, 가드) — lookup이 만들어 store로 그대로 넘김
+_SemProbe = Tuple[np.ndarray, Tuple]
+
+
+def _sem_guard(q: str, ctx: Tuple) -> Tuple:
+    """의미 캐시 적중 조건: 의도 문맥 + 질의 속 숫자(연도·코스 번호 등) + 언급된 프로그램이 모두 같을 것
+    (e5 유사도는 연도/센터명/코스 번호만 다른 질문끼리도 높게 나와 벡터만으로는 구분이 안 됨)"""
+    nq = normalize_query(q)
+    programs = tuple(sorted({str(d.get("name", "")) for _, d in scan_query(nq)}))
+    return ctx, tuple(_NUM_RUN.findall(nq)), programs
+
+
+class _AnswerCache:
+    """LLM 답변 프로세스 내 캐시: 질문 정확 일치(LRU) → 질의 임베딩 코사인 유사도(>= sim) 순으로 조회
+    - Redis 캐시(세션별 키)가 놓친 같은/거의 같은 질문에서 검색·리랭크·LLM을 건너뜀
+    - 의미 캐시는 가드(_sem_guard)가 같은 항목끼리만 비교, 정규화 벡터 행렬 내적 한 번
+    - 가득 차면 가장 오래된 칸부터 덮어씀 (링 버퍼)"""
+
+    def __init__(self, exact_size: int, sem_size: int, sim: float):
+        self._exact: "OrderedDict[str, str]" = OrderedDict()
+        self._exact_size = exact_size
+        self._sem_size = sem_size
+        self._sim = sim
+        self._vecs: Optional[np.ndarray] = None   # (sem_size, d) 앞쪽 len(_answers)행만 유효
+        self._ghash: Optional[np.ndarray] = None  # 행별 hash(가드) — 후보를 벡터 비교 전에 거름
+        self._guards: List[Tuple] = []
+        self._answers: List[str] = []
+        self._next = 0                            # 다음에 쓸 칸 (가득 찬 뒤에는 가장 오래된 칸)
+        self._lock = threading.Lock()
+
+    def _embed(self, q: str) -> Optional[np.ndarray]:
+        with contextlib.suppress(Exception):
+            # e5는 질의에 'query: ' 접두를 붙여야 유사도가 제대로 나옴
+            v = np.asarray(get_embedder().embed_query(f"query: {q}"), dtype=np.float32)
+            n = float(np.linalg.norm(v))
+            return v / n if n else None
+        return None
+
+    def lookup(self, q: str, ctx: Tuple = ()) -> Tuple[Optional[str], Optional[_SemProbe]]:
+        """(캐시된 답변 또는 None, 의미 캐시 조회값 — store에 다시 넘겨 임베딩/가드를 재사용)
+        ctx: 의도 분류 결과 등 같은 답을 공유해도 되는 문맥"""
+        with self._lock:
+            ans = self._exact.get(q)
+            if ans is not None:
+                self._exact.move_to_end(q)
+                return ans, None
+        if self._sem_size <= 0:
+            return None, None
+        qv = self._embed(q)
+        if qv is None:
+            return None, None
+        guard = _sem_guard(q, ctx)
+        with self._lock:
+            n = len(self._answers)
+            if n and self._vecs is not None and self._vecs.shape[1] == qv.shape[0]:
+                cand = np.flatnonzero(self._ghash[:n] == hash(guard))
+                if cand.size:
+                    sims = self._vecs[cand] @ qv
+                    k = int(sims.argmax())
+                    i = int(cand[k])
+                    if sims[k] >= self._sim and self._guards[i] == guard:
+                        return self._answers[i], (qv, guard)
+        return None, (qv, guard)
+
+    def store(self, q: str, probe: Optional[_SemProbe], ans: str):
+        if not ans:
+            return
+        with self._lock:
+            self._exact[q] = ans
+            self._exact.move_to_end(q)
+            while len(self._exact) > self._exact_size:
+                self._exact.popitem(last=False)
+            if probe is None or self._sem_size <= 0:
+                return
+            qv, guard = probe
+            if self._vecs is None or self._vecs.shape[1] != qv.shape[0]:
+                self._vecs = np.empty((self._sem_size, qv.shape[0]), dtype=np.float32)
+                self._ghash = np.empty(self._sem_size, dtype=np.int64)
+                self._guards, self._answers, self._next = [], [], 0
+            i = self._next
+            self._vecs[i] = qv
+            self._ghash[i] = hash(guard)
+            if i < len(self._answers):
+                self._guards[i], self._answers[i] = guard, ans
+            else:
+                self._guards.append(guard)
+                self._answers.append(ans)
+            self._next = (i + 1) % self._sem_size
+
+
+_ANSWER_CACHE = _AnswerCache(ANSWER_CACHE_SIZE, SEM_CACHE_SIZE, SEM_CACHE_SIM)
+
+
 # ────────────────────────────────────────────────────────────
 # 출력 포맷
 
@@ -196,8 +303,31 @@ def _to_html(text: str) -> str:
 # ────────────────────────────────────────────────────────────
 # 로컬 RAG/웹 보강(기존)
 
+_WORD_RUN = re.compile(r"\S+")
+
+
+def _clip(t: str, width: int = 420, placeholder: str = "…") -> str:
+    """공백을 한 칸으로 접고 width 안에서 공백 경계로만 자름 (하이픈에서도 끊는 textwrap.shorten과 다름)
+    - 앞에서부터 width를 넘는 지점까지만 단어를 훑음 → 긴 문서 전체를 split하지 않음"""
+    words: List[str] = []
+    n = -1
+    for m in _WORD_RUN.finditer(t):
+        w = m.group()
+        n += len(w) + 1
+        if n > width:
+            break
+        words.append(w)
+    else:
+        return " ".join(words)
+    # 넘쳤으면 placeholder까지 들어가도록 뒤 단어를 덜어냄
+    n -= len(w) + 1
+    while words and n + len(placeholder) > width:
+        n -= len(words.pop()) + 1
+    return (" ".join(words) + placeholder) if words else placeholder
+
+
 def _shorten(texts: List[str], width: int = 420) -> List[str]:
-    return [textwrap.shorten(t, width, placeholder="…") for t in texts if t and t.strip()]
+    return [_clip(t, width) for t in texts if t and t.strip()]
 
 
 def _expand_queries(q: str) -> List[str]:
@@ -266,52 +396,78 @@ def _local_ctx(q: str) -> Tuple[str, float, int]:
     return ctx, best_score, nraw
 
 
+# (docstore dict, 본문 튜플) — dict 객체가 같으면 재사용, 인덱스를 다시 로드해 dict가 바뀌면 다시 모음
+# (id() 대신 객체 자체를 잡아 두어 id 재사용으로 옛 목록을 돌려주는 일이 없게)
+_FUZZY_TEXTS_CACHE: Optional[Tuple[Dict, Tuple[str, ...]]] = None
+
+
+def _fuzzy_texts() -> Tuple[str, ...]:
+    """docstore 본문 목록 (질의마다 dict.values()를 훑지 않도록 캐시)"""
+    global _FUZZY_TEXTS_CACHE
+    store = getattr(get_vectorstore().docstore, "_dict", None) or {}
+    cached = _FUZZY_TEXTS_CACHE
+    if cached is not None and cached[0] is store:
+        return cached[1]
+    texts = tuple(d.page_content for d in store.values())
+    _FUZZY_TEXTS_CACHE = (store, texts)
+    return texts
+
+
 def _fuzzy_ctx(q: str) -> Optional[str]:
-    vs = get_vectorstore()
-    texts = [d.page_content for d in getattr(vs.docstore, "_dict", {}).values()]
+    texts = _fuzzy_texts()
     if not texts:
         return None
-    pairs = process.extract(q, texts, scorer=fuzz.partial_ratio, limit=FUZZ_LIMIT)
-    chosen = [t for t, score, _ in pairs if score >= FUZZ_SCORE]
+    # 전체 문서를 cdist 한 번으로 채점(멀티코어, FUZZ_SCORE 미만은 C 쪽에서 조기 종료 후 0)
+    # → 점수 내림차순(동점은 문서 순서) 상위 FUZZ_LIMIT: process.extract + 점수 필터와 같은 결과
+    scores = process.cdist([q], texts, scorer=fuzz.partial_ratio, dtype=np.float64,
+                           workers=-1, score_cutoff=FUZZ_SCORE)[0]
+    idx = np.flatnonzero(scores >= FUZZ_SCORE)
+    idx = idx[np.argsort(-scores[idx], kind="stable")][:FUZZ_LIMIT]
+    chosen = [texts[i] for i in idx]
     if not chosen:
         return None
     return "\n\n".join(_shorten(chosen))
 
 
+# 검색 결과 라벨 후보 (앞에서부터 처음 값이 있는 키) — 링크가 있는 결과만 쓰므로 마지막엔 링크 자체
+_HIT_LABEL_CTX = ("title", "snippet", "link")
+_HIT_LABEL_FALLBACK = ("title", "link")
+
+
+def _pick(h: dict, keys: Tuple[str, ...]) -> str:
+    return next((v for v in map(h.get, keys) if v), "")
+
+
+def _hit_anchors(hits: List[dict], label_keys: Tuple[str, ...]) -> List[str]:
+    """링크 있는 결과만 앵커로 (DDG 결과 키: title/snippet/link)"""
+    return [_anchor(h["link"], _pick(h, label_keys)) for h in hits if h.get("link")]
+
+
 def _format_hits(hits: List[dict], max_items: int) -> Optional[str]:
     if not hits:
         return None
-    out = []
-    for h in hits[:max_items]:
-        title = h.get("title") or h.get("snippet") or h.get("link")
-        link = h.get("link")
-        if not link:
-            continue
-        out.append(_anchor(link, title))
+    out = _hit_anchors(hits[:max_items], _HIT_LABEL_CTX)
     return "<br>".join(out) if out else None
 
 
-def _web_ctx(q: str) -> Optional[str]:
+def _web_hits(q: str) -> Optional[List[dict]]:
+    """DDG 검색 한 번 — 웹 폴백(상위 5개)과 융합 컨텍스트(DDG_HITS개)가 같은 결과를 나눠 씀"""
     with contextlib.suppress(Exception):
-        hits = _DDG.results(q, max_results=DDG_HITS)
-        return _format_hits(hits, DDG_HITS)
+        return _DDG.results(q, max_results=max(5, DDG_HITS))
     return None
 
 
-def _web_fallback_answer(q: str) -> Optional[str]:
-    with contextlib.suppress(Exception):
-        hits = _DDG.results(q, max_results=5)
-        if not hits:
-            return None
-        lines = []
-        for h in hits[:5]:
-            title = h.get("title") or h.get("link")
-            link = h.get("link")
-            if not link:
-                continue
-            lines.append(f"- {_anchor(link, title)}")
-        return "내 문서에서 정확히 찾기 어렵습니다. 다음 자료를 참고해 주세요:\n\n" + "\n".join(lines)
-    return None
+def _web_ctx(hits: Optional[List[dict]]) -> Optional[str]:
+    if not hits:
+        return None
+    return _format_hits(hits, DDG_HITS)
+
+
+def _web_fallback_answer(hits: Optional[List[dict]]) -> Optional[str]:
+    if not hits:
+        return None
+    lines = [f"- {a}" for a in _hit_anchors(hits[:5], _HIT_LABEL_FALLBACK)]
+    return "내 문서에서 정확히 찾기 어렵습니다. 다음 자료를 참고해 주세요:\n\n" + "\n".join(lines)
 
 
 # ────────────────────────────────────────────────────────────
@@ -377,30 +533,18 @@ STATUS_WORDS = {"진행": "진행중", "진행중": "진행중", "모집중": "
 Q_WORDS = ("프로그램", "모집", "신청", "접수", "교육", "공모", "행사")
 
 
+# 키워드 판정은 매처로 질의를 한 번만 훑음 (키워드마다 `w in q` 반복 대신)
+_TIME_WORDS = (*REL_WORDS, "지난달", "이번달", "다음달", "재작년", "상반기", "하반기", "1분기", "2분기", "3분기", "4분기", "기간")
+_Q_MATCHER = KeywordMatcher((k, k) for k in Q_WORDS)
+_TIME_MATCHER = KeywordMatcher((w, w) for w in _TIME_WORDS)
+_STATUS_MATCHER = KeywordMatcher(STATUS_WORDS.items())
+
+
 def is_program_date_query(q: str) -> bool:
-    has_kw = any(k in q for k in Q_WORDS)
-    has_time = bool(
-        ABS_RANGE.search(q)
-        or ABS_ONE.search(q)
-        or any(w in q for w in REL_WORDS.keys())
-        or any(
-            w in q
-            for w in [
-                "지난달",
-                "이번달",
-                "다음달",
-                "재작년",
-                "상반기",
-                "하반기",
-                "1분기",
-                "2분기",
-                "3분기",
-                "4분기",
-                "기간",
-            ]
-        )
-    )
-    return has_kw and has_time
+    # 키워드가 없으면 날짜 정규식은 볼 필요 없음 (ABS_RANGE가 맞으면 ABS_ONE도 맞으므로 ABS_ONE만 검사)
+    if not _Q_MATCHER.contains_any(q):
+        return False
+    return _TIME_MATCHER.contains_any(q) or bool(ABS_ONE.search(q))
 
 
 def month_start(dt: date) -> date:
@@ -490,10 +634,9 @@ def parse_korean_date_range(q: str, today: date = TODAY) -> Tuple[Optional[date]
 
 
 def detect_status_filter(q: str) -> Optional[str]:
-    for k, v in STATUS_WORDS.items():
-        if k in q:
-            return v
-    return None
+    # STATUS_WORDS 등록 순서상 첫 키워드의 상태 (기존 순회와 동일)
+    hits = _STATUS_MATCHER.find(q)
+    return hits[0][1] if hits else None
 
 
 def overlaps(a_start: Optional[date], a_end: Optional[date], b_start: Optional[date], b_end: Optional[date]) -> bool:
@@ -679,15 +822,44 @@ async def ask_async(question: str, session_id: Optional[str] = None) -> str:
         await _save_state(session_id, {**state, "last_intent": "program_period"})
         return _to_html(answer)
 
+    # 5-1) 이전 LLM 답변 (같은 질문 → 의미상 거의 같은 질문)
+    # 조회에 질의 임베딩(첫 요청이면 모델 로드까지)이 들어가므로 이벤트 루프 밖에서
+    # 의미 캐시는 의도 분류 결과(의도/연락처 종류/프로그램/태그)가 같은 질문끼리만 공유
+    sem_ctx = tuple(info.get(k) for k in ("intent", "contact_type", "program_name", "tag"))
+    prev_ans, sem_probe = await asyncio.to_thread(_ANSWER_CACHE.lookup, q, sem_ctx)
+    if prev_ans:
+        asyncio.create_task(_set_cached(cache_key, prev_ans))
+        await _save_state(session_id, {**state, "last_intent": "ask_info"})
+        return _to_html(prev_ans)
+
     # 6) 로컬 → LLM
-    local_ctx, best, nraw = _local_ctx(q)
+    return await _answer_from_contexts(q, sem_probe, cache_key, session_id, state)
+
+
+async def _answer_from_contexts(q: str, sem_probe: Optional[_SemProbe], cache_key: str,
+                                session_id: Optional[str], state: Dict) -> str:
+    # 검색/LLM 호출은 블로킹이라 스레드로 넘겨 이벤트 루프(다른 요청)를 막지 않음
+    local_ctx, best, nraw = await asyncio.to_thread(_local_ctx, q)
     if local_ctx and (best >= LOCAL_HIT_THRES or nraw > 0):
-        ans_local = _llm_single(q, local_ctx)
+        ans_local = await asyncio.to_thread(_llm_single, q, local_ctx)
         if ans_local and not re.match(r"^(모르겠|잘 알 수 없|확인이 필요|정보가 부족)", ans_local):
+            _ANSWER_CACHE.store(q, sem_probe, ans_local)
             asyncio.create_task(_set_cached(cache_key, ans_local))
             await _save_state(session_id, {**state, "last_intent": "ask_info"})
             return _to_html(ans_local)
 
+    # 로컬에서 답이 안 나온 경우에만 웹 검색(네트워크 대기)을 FAQ/퍼지 단계와 동시에 미리 시작
+    web_task = asyncio.create_task(asyncio.to_thread(_web_hits, q)) if WEB_PREFETCH else None
+    try:
+        return await _answer_from_fallbacks(q, sem_probe, cache_key, session_id, state, local_ctx, web_task)
+    finally:
+        if web_task is not None:
+            web_task.cancel()
+
+
+async def _answer_from_fallbacks(q: str, sem_probe: Optional[_SemProbe], cache_key: str,
+                                 session_id: Optional[str], state: Dict, local_ctx: str,
+                                 web_task: Optional["asyncio.Task"]) -> str:
     # 7) FAQ(약)
     faq_ans_soft = find_faq_answer(q, hard_threshold=FAQ_WEAK, soft_threshold=FAQ_WEAK)
     if faq_ans_soft:
@@ -696,24 +868,28 @@ async def ask_async(question: str, session_id: Optional[str] = None) -> str:
         return _to_html(faq_ans_soft)
 
     # 8) 퍼지 + LLM
-    fuzzy_ctx = _fuzzy_ctx(q)
+    fuzzy_ctx = await asyncio.to_thread(_fuzzy_ctx, q)
     if fuzzy_ctx:
-        ans_fuzzy = _llm_single(q, fuzzy_ctx)
+        ans_fuzzy = await asyncio.to_thread(_llm_single, q, fuzzy_ctx)
         if ans_fuzzy and not re.match(r"^(모르겠|잘 알 수 없|확인이 필요|정보가 부족)", ans_fuzzy):
+            _ANSWER_CACHE.store(q, sem_probe, ans_fuzzy)
             asyncio.create_task(_set_cached(cache_key, ans_fuzzy))
             await _save_state(session_id, {**state, "last_intent": "ask_info"})
             return _to_html(ans_fuzzy)
 
     # 9) 웹 폴백
-    web_summary = _web_fallback_answer(q)
+    hits = await web_task if web_task is not None else await asyncio.to_thread(_web_hits, q)
+    web_summary = _web_fallback_answer(hits)
     if web_summary:
+        _ANSWER_CACHE.store(q, sem_probe, web_summary)
         asyncio.create_task(_set_cached(cache_key, web_summary))
         await _save_state(session_id, {**state, "last_intent": "web_fallback"})
         return _to_html(web_summary)
 
     # 10) 최종 융합
-    web_ctx = _web_ctx(q) or ""
-    final = _llm_fusion(q, local_ctx or fuzzy_ctx or "", "", web_ctx)
+    web_ctx = _web_ctx(hits) or ""
+    final = await asyncio.to_thread(_llm_fusion, q, local_ctx or fuzzy_ctx or "", "", web_ctx)
+    _ANSWER_CACHE.store(q, sem_probe, final)
     asyncio.create_task(_set_cached(cache_key, final))
     await _save_state(session_id, {**state, "last_intent": "ask_info"})
     return _to_html(final)
@@ -722,17 +898,55 @@ async def ask_async(question: str, session_id: Optional[str] = None) -> str:
 # ────────────────────────────────────────────────────────────
 # LLM 호출 래퍼
 
+def _split_template(tpl: str, *slots: str) -> Tuple[str, ...]:
+    """{style}은 미리 채우고, 슬롯 사이의 고정 조각만 남김 (slots는 템플릿 등장 순서대로)"""
+    rest = tpl.replace("{style}", STYLE_GUIDE)
+    parts: List[str] = []
+    for slot in slots:
+        head, sep, rest = rest.partition("{" + slot + "}")
+        if not sep:
+            raise ValueError(f"템플릿에 {{{slot}}} 슬롯이 없습니다")
+        parts.append(head)
+    parts.append(rest)
+    return tuple(parts)
+
+
+# 호출마다 .format 파싱을 하지 않도록 고정 조각은 import 시 한 번만 만듦
+# (조각 사이에 값을 끼워 join → 컨텍스트에 '{'가 있어도 .format과 결과 동일)
+_SINGLE_PARTS = _split_template(PROMPT_SINGLE, "context", "question")
+_FUSION_PARTS = _split_template(PROMPT_FUSION, "local_ctx", "rule_ctx", "web_ctx", "question")
+
+
+def _fill(parts: Tuple[str, ...], *values: str) -> str:
+    out = [parts[0]]
+    for v, p in zip(values, parts[1:]):
+        out.append(v)
+        out.append(p)
+    return "".join(out)
+
+
 def _llm_single(q: str, ctx: str) -> str:
-    msg = PROMPT_SINGLE.format(style=STYLE_GUIDE, context=ctx or "없음", question=q)
+    msg = _fill(_SINGLE_PARTS, ctx or "없음", q)
     return _LLM.invoke([_SYS, HumanMessage(content=msg)]).content.strip()
 
 
 def _llm_fusion(q: str, local_ctx: str, rule_ctx: str, web_ctx: str) -> str:
-    msg = PROMPT_FUSION.format(
-        style=STYLE_GUIDE,
-        local_ctx=local_ctx or "없음",
-        rule_ctx=rule_ctx or "없음",
-        web_ctx=web_ctx or "없음",
-        question=q,
-    )
-    return _LLM.invoke([_SYS, HumanMessage(content=msg)]).content.strip()
\ No newline at end of file
+    msg = _fill(_FUSION_PARTS, local_ctx or "없음", rule_ctx or "없음", web_ctx or "없음", q)
+    return _LLM.invoke([_SYS, HumanMessage(content=msg)]).content.strip()
+
+
+def _warm_start() -> None:
+    """임베더·FAISS 인덱스·BM25·퍼지 본문 목록을 미리 로드 (첫 요청의 콜드 스타트 제거)
+    - 실패해도 조용히 넘김: 요청 경로가 같은 함수를 다시 부르며 원래 오류를 그대로 냄"""
+    try:
+        get_embedder()  # 모델 로드 + 더미 인코딩(인덱스가 없어도 모델은 올라오게 먼저)
+        get_retriever()
+        _fuzzy_texts()
+    except Exception:
+        pass
+
+
+# import 직후 백그라운드 스레드에서 로드 → 서버가 뜨는 동안 모델/인덱스가 올라옴
+# (로드가 끝나기 전에 요청이 오면 그 요청은 지금처럼 직접 로드)
+if WARM_START:
+    threading.Thread(target=_warm_start, name="rag-warm-start", daemon=True).start()
@@ -1,7 +1,16 @@
 # app/rag/embeddings.py
 import os
+import threading
+
+# CUDA 캐싱 할당기가 배치 크기가 바뀔 때마다 새 블록을 cudaMalloc하지 않고 세그먼트를 늘려 쓰도록
+# (torch import 전에 설정해야 적용; 사용자가 지정한 값은 그대로 둠)
+os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True")
 import torch
-from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
 from langchain_community.embeddings import HuggingFaceEmbeddings
 
 try:
@@ -9,13 +18,121 @@ try:
     from app.config import EMBED_MODEL_ID
 except Exception:
     EMBED_MODEL_ID = os.getenv("EMBED_MODEL_ID", "intfloat/e5-large-v2")
+try:
+    from app.config import EMBED_BATCH_SIZE, EMBED_MAX_SEQ_LEN, EMBED_FP16
+except Exception:
+    EMBED_BATCH_SIZE, EMBED_MAX_SEQ_LEN, EMBED_FP16 = 64, 0, True
+try:
+    from app.config import EMBED_ONNX_DIR
+except Exception:
+    EMBED_ONNX_DIR = os.getenv("EMBED_ONNX_DIR", "")
+
+# INT8 ONNX 임베더(선택): onnxruntime + transformers(fast tokenizer)가 있고 EMBED_ONNX_DIR이 있을 때만
+try:
+    import onnxruntime as ort  # type: ignore
+    from transformers import AutoTokenizer  # type: ignore
+    _HAS_ORT = True
+except Exception:
+    _HAS_ORT = False
+
+
+class OnnxEmbeddings(Embeddings):
+    """scripts/quantize_embedder.py로 만든 (동적 INT8) ONNX 모델 임베더
+    - CPU에서 가중치 바이트가 ¼이라 대역폭 한계인 인코딩이 빨라짐 (VNNI int8 내적)
+    - mean pooling + L2 정규화는 NumPy로 → HuggingFaceEmbeddings(normalize_embeddings=True)와 같은 형식"""
+
+    def __init__(self, model_dir: str, batch_size: int = 64, max_seq_length: int = 0):
+        d = Path(model_dir)
+        self.tokenizer = AutoTokenizer.from_pretrained(str(d), use_fast=True)
+        model_max = self.tokenizer.model_max_length
+        if not model_max or model_max > 100_000:  # 일부 토크나이저는 '무제한' 표시로 아주 큰 값
+            model_max = 512
+        self.max_seq_length = min(max_seq_length, model_max) if max_seq_length > 0 else model_max
+        self.batch_size = batch_size
+        path = next(iter(sorted(d.glob("*quantized.onnx"))), d / "model.onnx")
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = max(1, (os.cpu_count() or 2) // 2)  # 물리 코어 정도
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._sess = ort.InferenceSession(str(path), opts, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self._sess.get_inputs()}
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        out: List[np.ndarray] = []
+        for i in range(0, len(texts), self.batch_size):
+            enc = self.tokenizer(
+                texts[i:i + self.batch_size], padding=True, truncation=True,
+                max_length=self.max_seq_length, return_tensors="np",
+            )
+            feeds = {k: v.astype(np.int64) for k, v in enc.items() if k in self._input_names}
+            hidden = self._sess.run(None, feeds)[0]  # (batch, tokens, dim) last_hidden_state
+            mask = enc["attention_mask"].astype(np.float32)
+            vec = np.einsum("btd,bt->bd", hidden, mask) / np.maximum(mask.sum(axis=1, keepdims=True), 1e-9)
+            vec /= np.maximum(np.linalg.norm(vec, axis=1, keepdims=True), 1e-12)
+            out.append(vec.astype(np.float32))
+        return np.vstack(out) if out else np.zeros((0, 0), dtype=np.float32)
 
-@lru_cache(maxsize=1)
-def get_embedder() -> HuggingFaceEmbeddings:
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._encode(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0].tolist()
+
+
+def _use_onnx() -> bool:
+    return bool(EMBED_ONNX_DIR) and _HAS_ORT and Path(EMBED_ONNX_DIR).is_dir()
+
+
+def embedder_id() -> str:
+    """임베딩 캐시 키용 식별자 — 벡터를 바꾸는 설정(ONNX INT8, 최대 길이 절단, FP16)이 다르면 섞이지 않게 구분"""
+    if _use_onnx():
+        ident = f"{EMBED_MODEL_ID}@onnx:{EMBED_ONNX_DIR}"
+    else:
+        ident = EMBED_MODEL_ID
+        if EMBED_FP16 and torch.cuda.is_available():
+            ident += "@fp16"
+    if EMBED_MAX_SEQ_LEN > 0:
+        ident += f"@seq:{EMBED_MAX_SEQ_LEN}"
+    return ident
+
+
+# 모듈 전역 싱글턴 — 로드 후에는 전역 하나만 읽고 반환 (락은 첫 로드 때만)
+_EMBEDDER: Optional[Embeddings] = None
+_EMBEDDER_LOCK = threading.Lock()
+
+
+def get_embedder() -> Embeddings:
     """한 번 로드 후 재사용"""
+    global _EMBEDDER
+    emb = _EMBEDDER
+    if emb is not None:
+        return emb
+    with _EMBEDDER_LOCK:  # 워밍업 스레드와 첫 요청이 동시에 와도 모델은 한 번만 로드
+        if _EMBEDDER is None:
+            emb = _build_embedder()
+            # 더미 입력으로 한 번 돌려 CUDA 컨텍스트/커널 로드를 첫 질의 전에 끝냄
+            try:
+                emb.embed_query("warmup")
+            except Exception:
+                pass
+            _EMBEDDER = emb
+        return _EMBEDDER
+
+
+def _build_embedder() -> Embeddings:
+    if _use_onnx():
+        return OnnxEmbeddings(EMBED_ONNX_DIR, batch_size=EMBED_BATCH_SIZE, max_seq_length=EMBED_MAX_SEQ_LEN)
+
     device = "cuda" if torch.cuda.is_available() else "cpu"
-    return HuggingFaceEmbeddings(
+    emb = HuggingFaceEmbeddings(
         model_name=EMBED_MODEL_ID,
         model_kwargs={"device": device},
-        encode_kwargs={"normalize_embeddings": True, "batch_size": 32},
+        encode_kwargs={"normalize_embeddings": True, "batch_size": EMBED_BATCH_SIZE},
     )
+    model = emb.client  # SentenceTransformer
+    # 배치 패딩 길이 상한 (0이면 모델 기본값) — 긴 청크 하나가 배치 전체를 늘리지 않게
+    if EMBED_MAX_SEQ_LEN > 0:
+        model.max_seq_length = min(EMBED_MAX_SEQ_LEN, model.max_seq_length or EMBED_MAX_SEQ_LEN)
+    # GPU에서는 FP16 가중치로 (행렬곱 처리량 ↑, 메모리 ½) — 정규화 벡터라 순위 영향은 미미
+    if device == "cuda" and EMBED_FP16:
+        model.half()
+    return emb
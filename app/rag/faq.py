@@ -1,7 +1,11 @@
 from __future__ import annotations
-from typing import List, Optional, Tuple, Dict
+from typing import List, NamedTuple, Optional, Tuple
 import re
-from rapidfuzz import fuzz
+import sys
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from app.rag.matcher import KeywordMatcher
 
 # === 1) 기존 FAQ 데이터 ===
 FAQ_ENTRIES = [
@@ -187,23 +191,30 @@ def _guess_intent_hint(texts: List[str], answer: str) -> str:
     return "info"
 
 # === 4) 인덱스 ===
-_CANDS: List[Dict[str, str]] = []
+class _Cand(NamedTuple):
+    q_raw: str
+    q_norm: str
+    answer: str
+    intent_hint: str
+
+_CANDS: List[_Cand] = []
 for item in FAQ_ENTRIES:
     ans = str(item["answer"])
     intent_hint = _guess_intent_hint(item.get("qs", []), ans)
     for q in item["qs"]:
-        _CANDS.append({
-            "q_raw": q,
-            "q_norm": _normalize(q),
-            "answer": ans,
-            "intent_hint": intent_hint,
-        })
+        _CANDS.append(_Cand(q, sys.intern(_normalize(q)), ans, intent_hint))
+
+# 부분 문자열 검사용: 질의에 들어 있는 후보 질문은 매처 한 번으로,
+# 질의가 후보 질문 안에 들어 있는지는 전체를 이은 문자열에서 먼저 걸러냄 (\x00은 정규화 결과에 없음)
+_CAND_MATCHER = KeywordMatcher((c.q_norm, c) for c in _CANDS)
+_CAND_BLOB = "\x00".join(c.q_norm for c in _CANDS)
 
 # === 5) 매칭 ===
-def _score(a: str, b: str) -> int:
-    ts = fuzz.token_set_ratio(a, b)
-    pr = fuzz.partial_ratio(a, b)
-    return int(0.6 * ts + 0.4 * pr)
+def _scores(q: str, norms: List[str]) -> np.ndarray:
+    """후보 전체 점수 int(0.6*token_set + 0.4*partial) — 두 scorer를 cdist로 한 번씩 돌려 배열로 결합"""
+    ts = process.cdist([q], norms, scorer=fuzz.token_set_ratio, dtype=np.float64)[0]
+    pr = process.cdist([q], norms, scorer=fuzz.partial_ratio, dtype=np.float64)[0]
+    return (0.6 * ts + 0.4 * pr).astype(np.int64)  # 음수가 없어 int()의 버림과 같음
 
 def find_faq_answer(
     query: str,
@@ -218,33 +229,32 @@ def find_faq_answer(
 
     pool = list(_CANDS)
     if preferred_intent:
-        filtered = [c for c in pool if c.get("intent_hint") == preferred_intent]
+        filtered = [c for c in pool if c.intent_hint == preferred_intent]
         if filtered:
             pool = filtered
 
     if blocked_intents:
         blocked = set(blocked_intents)
-        pool = [c for c in pool if c.get("intent_hint") not in blocked]
+        pool = [c for c in pool if c.intent_hint not in blocked]
 
     if not pool:
         return None
 
-    for c in pool:
-        cn = c["q_norm"]
-        if cn and (cn in qn or qn in cn):
-            return c["answer"]
+    inside = {c for _, c in _CAND_MATCHER.find(qn)}  # q_norm이 질의에 포함된 후보
+    if inside or qn in _CAND_BLOB:
+        for c in pool:
+            cn = c.q_norm
+            if cn and (c in inside or qn in cn):
+                return c.answer
 
-    best: Optional[Dict[str, str]] = None
-    best_score = -1
-    for c in pool:
-        s = _score(qn, c["q_norm"])
-        if s > best_score:
-            best_score = s
-            best = c
+    scores = _scores(qn, [c.q_norm for c in pool])
+    i = int(scores.argmax())  # 동점이면 앞선 후보 (기존 루프의 '>' 비교와 같음)
+    best: Optional[_Cand] = pool[i]
+    best_score = int(scores[i])
 
     if best and best_score >= hard_threshold:
-        return best["answer"]
+        return best.answer
     if best and best_score >= soft_threshold:
-        return best["answer"]
+        return best.answer
 
     return None
@@ -2,7 +2,7 @@ from __future__ import annotations
 import re
 from typing import Dict, Optional
 
-from app.rag.textnorm import normalize_query, no_space
+from app.rag.textnorm import make_nq
 from app.rag.programs import (
     fuzzy_find_best_alias, fuzzy_find_best_tag, contains_program_keyword
 )
@@ -36,25 +36,15 @@ _HOURS_TRIGGER = re.compile(r"(운영\s*시간|업무\s*시간|영업\s*시간|
 # 주소 키워드(명시적)
 _ADDR_KEYWORDS = re.compile(r"(주소|위치|찾아오시는\s*길|오시는\s*길|지도|약도)", re.IGNORECASE)
 
-# 숫자형 코스 별칭
-_COURSE_NUM = re.compile(
-    r"(?:(전문|일반)\s*코스\s*([0-9]+)|"
-    r"(전문|일반)코스\s*([0-9]+)|"
-    r"(전문|일반)\s*코스([0-9]+)|"
-    r"코스\s*([0-9]+))",
-    re.IGNORECASE,
-)
+# 숫자형 코스 별칭 — '(전문|일반) 코스 N' / '코스 N'을 한 패턴으로
+# (띄어쓰기 변형은 \s*가 모두 덮고, 종류 없는 '코스 N'은 kind 그룹이 비어 별칭 없음)
+_COURSE_NUM = re.compile(r"(?:(?P<kind>전문|일반)\s*코스|코스)\s*(?P<num>[0-9]+)", re.IGNORECASE)
 
 def _extract_course_alias(q: str) -> Optional[str]:
     m = _COURSE_NUM.search(q)
-    if not m:
+    if not m or not m.group("kind"):
         return None
-    if m.group(1) and m.group(2):   kind, num = m.group(1), m.group(2)
-    elif m.group(3) and m.group(4): kind, num = m.group(3), m.group(4)
-    elif m.group(5) and m.group(6): kind, num = m.group(5), m.group(6)
-    else:                           kind, num = None, m.group(7)
-    kind = (kind or "").replace(" ", "")
-    return f"{kind}코스 {num}".strip() if kind else None
+    return f"{m.group('kind')}코스 {m.group('num')}"
 
 def _detect_contact_type(q: str) -> Optional[str]:
     if _EMAIL_TRIGGER.search(q):   return "email"
@@ -67,24 +57,27 @@ def _detect_contact_type(q: str) -> Optional[str]:
 
 def classify_intent_and_entity(text: str) -> Dict[str, Optional[str]]:
     """질문 → {intent, contact_type, program_name, tag}"""
-    q = normalize_query(text)
-    qns = no_space(q)
+    nq = make_nq(text)  # 정규화는 여기서 한 번 — 아래 매처들은 nq를 그대로 받음
+    q, qns = nq.norm, nq.no_space
 
     alias_from_course = _extract_course_alias(q)
-    alias = alias_from_course or (fuzzy_find_best_alias(q, min_score=80) or "")
-    tag   = fuzzy_find_best_tag(q,   min_score=80)
+    tag   = fuzzy_find_best_tag(nq,  min_score=80)
+    nav   = _NAV_TRIGGER.search(q)
 
     # 프로그램 + (주소/어디서/확인/링크/URL) → URL
-    if contains_program_keyword(q) and (("주소" in q) or _NAV_TRIGGER.search(q)):
+    if contains_program_keyword(nq) and (("주소" in q) or nav):
+        alias = alias_from_course or (fuzzy_find_best_alias(nq, min_score=80) or "")
         return {"intent": "find_program_url", "contact_type": None, "program_name": alias or alias_from_course or "", "tag": tag}
 
-    # 연락처(최우선)
+    # 연락처(최우선) — 프로그램명을 쓰지 않으므로 별칭 퍼지 검색 전에 판정
     ctype = _detect_contact_type(q)
     if ctype:
         return {"intent": "ask_contact", "contact_type": ctype, "program_name": "", "tag": tag}
 
+    alias = alias_from_course or (fuzzy_find_best_alias(nq, min_score=80) or "")
+
     # URL/내용
-    wants_url  = bool(_NAV_TRIGGER.search(q) or _NAV_TRIGGER.search(qns))
+    wants_url  = bool(nav or _NAV_TRIGGER.search(qns))
     wants_info = bool(_INFO_TRIGGER.search(q))
 
     # 숫자 코스 패턴 + 주소/URL 힌트 → URL
@@ -0,0 +1,52 @@
+# app/rag/matcher.py
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Tuple
+
+# 여러 키워드(별칭/태그 등)가 질의에 '부분 문자열'로 들어 있는지 한 번에 훑는 매처
+# - pyahocorasick 있으면 Aho-Corasick 오토마톤으로 질의 1회 스캔 (O(|질의|))
+# - 없으면 기존처럼 키워드마다 `kw in text` 검사로 대체
+try:
+    import ahocorasick  # type: ignore
+    _HAS_AHOCORASICK = True
+except Exception:
+    _HAS_AHOCORASICK = False
+
+
+class KeywordMatcher:
+    """(키워드, 값) 목록으로 만든 부분 문자열 매처. 결과는 항상 키워드 등록 순서."""
+
+    def __init__(self, pairs: Iterable[Tuple[str, Any]]):
+        self._values: Dict[str, List[Any]] = {}
+        for kw, val in pairs:
+            if kw:
+                self._values.setdefault(kw, []).append(val)
+        self._order: Dict[str, int] = {kw: i for i, kw in enumerate(self._values)}
+        self._ac = None
+        if _HAS_AHOCORASICK and self._values:
+            ac = ahocorasick.Automaton()
+            for kw in self._values:
+                ac.add_word(kw, kw)
+            ac.make_automaton()
+            self._ac = ac
+
+    def keywords_in(self, text: str) -> List[str]:
+        """text에 포함된 (중복 없는) 키워드 목록"""
+        if not text:
+            return []
+        if self._ac is not None:
+            found = {kw for _, kw in self._ac.iter(text)}
+            return sorted(found, key=self._order.__getitem__)
+        return [kw for kw in self._values if kw in text]
+
+    def find(self, text: str) -> List[Tuple[str, Any]]:
+        """text에 포함된 키워드마다 (키워드, 값) 쌍. 같은 키워드에 값이 여럿이면 모두 반환"""
+        return [(kw, v) for kw in self.keywords_in(text) for v in self._values[kw]]
+
+    def contains_any(self, text: str) -> bool:
+        if not text:
+            return False
+        if self._ac is not None:
+            for _ in self._ac.iter(text):
+                return True
+            return False
+        return any(kw in text for kw in self._values)
@@ -1,17 +1,78 @@
 # app/rag/reranker.py
-from typing import List, Tuple
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+import numpy as np
 import torch
 from sentence_transformers import CrossEncoder
-from app.config import RERANK_MODEL_ID, RERANK_TOP_N
+from app.config import RERANK_MODEL_ID, RERANK_TOP_N, RERANK_CACHE_SIZE
 
 _device = "cuda" if torch.cuda.is_available() else "cpu"
 _model = CrossEncoder(RERANK_MODEL_ID, device=_device, max_length=512)
+if _device == "cuda":
+    # GPU: FP16 가중치로 텐서코어 사용, FP32로 남는 연산은 TF32 허용
+    _model.model.half()
+    torch.backends.cuda.matmul.allow_tf32 = True
+_BATCH_SIZE = 32
+
+# 동시 요청이 토크나이저/모델 상태를 같이 건드리지 않도록 predict·캐시는 락 안에서
+_lock = threading.Lock()
+
+# 첫 요청에서 CUDA 커널 준비/cuBLAS 튜닝 비용을 내지 않도록 import 시 더미 배치로 워밍업
+try:
+    with torch.inference_mode():
+        _model.predict([("warmup", "warmup")], convert_to_numpy=True, show_progress_bar=False)
+except Exception:
+    pass
+
+# (질의, 문서) → 점수 LRU: 반복 질의는 CrossEncoder forward 생략
+_score_cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+
+def _scores(query: str, docs: List[str]) -> List[float]:
+    """캐시에 없는 쌍만 한 배치로 predict"""
+    with _lock:
+        return _scores_locked(query, docs)
+
+def _scores_locked(query: str, docs: List[str]) -> List[float]:
+    # 같은 문서 문자열은 한 번만 채점 (벡터/BM25가 같은 청크를 함께 돌려준 경우)
+    uniq: Dict[str, float] = {}
+    missing: List[str] = []
+    for d in docs:
+        if d in uniq:
+            continue
+        key = (query, d)
+        if key in _score_cache:
+            _score_cache.move_to_end(key)
+            uniq[d] = _score_cache[key]
+        else:
+            uniq[d] = 0.0
+            missing.append(d)
+    if missing:
+        with torch.inference_mode():
+            pred = _model.predict(
+                [(query, d) for d in missing],
+                batch_size=_BATCH_SIZE,
+                show_progress_bar=False,
+                convert_to_numpy=True,
+            )
+        for d, s in zip(missing, pred):
+            uniq[d] = float(s)
+            _score_cache[(query, d)] = uniq[d]
+        while len(_score_cache) > RERANK_CACHE_SIZE:
+            _score_cache.popitem(last=False)
+    return [uniq[d] for d in docs]
 
 def rerank(query: str, docs: List[str], top_n: int = RERANK_TOP_N) -> Tuple[List[str], float]:
     if not docs:
         return [], 0.0
-    scores = _model.predict([(query, d) for d in docs], convert_to_numpy=True)
-    pairs = sorted(zip(docs, scores), key=lambda t: -t[1])
-    top_docs = [d for d, _ in pairs[:top_n]]
-    best = float(pairs[0][1]) if pairs else 0.0
+    scores = np.asarray(_scores(query, docs), dtype=np.float64)
+    k = max(0, min(top_n, scores.size))
+    if k < scores.size:
+        # 전체 정렬 대신 상위 k개만 골라(O(N)) 그 안에서만 정렬
+        idx = np.sort(np.argpartition(-scores, k - 1)[:k]) if k else np.empty(0, dtype=np.intp)
+    else:
+        idx = np.arange(scores.size)
+    idx = idx[np.argsort(-scores[idx], kind="stable")]
+    top_docs = [docs[i] for i in idx]
+    best = float(scores.max())
     return top_docs, best
@@ -1,12 +1,19 @@
 # app/rag/retriever.py
 from __future__ import annotations
+import contextlib
+import fcntl
+import os
+import pickle
 from functools import lru_cache
-from typing import List
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_community.retrievers import BM25Retriever
-from langchain.retrievers.merger_retriever import MergerRetriever
 from langchain.schema import Document
+from langchain_core.retrievers import BaseRetriever
 
 from app.rag.embeddings import get_embedder
 
@@ -17,34 +24,238 @@ except Exception:
     RETRIEVER_K = 6
     VEC_WEIGHT = 0.6
     BM25_WEIGHT = 0.4
+try:
+    from app.config import HNSW_EF_SEARCH, FAISS_THREADS
+except Exception:
+    HNSW_EF_SEARCH, FAISS_THREADS = 64, 0
+try:
+    from app.config import IVF_NPROBE
+except Exception:
+    IVF_NPROBE = 16
+
+def set_faiss_threads():
+    """FAISS OpenMP 스레드 = 물리 코어 수 (하이퍼스레딩은 대역폭만 나눠 써서 이득 없음)"""
+    n = FAISS_THREADS
+    if n <= 0:
+        try:
+            import psutil  # type: ignore
+            n = psutil.cpu_count(logical=False) or 0
+        except Exception:
+            n = 0
+    n = n or os.cpu_count() or 1
+    with contextlib.suppress(Exception):
+        import faiss  # type: ignore
+        faiss.omp_set_num_threads(n)
+
+def _tune_vectorstore(vs: FAISS) -> FAISS:
+    """인덱스 메트릭에 맞춰 거리 전략을 맞추고(IP 인덱스면 내적), HNSW면 efSearch·IVF면 nprobe 설정"""
+    with contextlib.suppress(Exception):
+        import faiss  # type: ignore
+        if vs.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+            vs.distance_strategy = DistanceStrategy.MAX_INNER_PRODUCT
+        hnsw = getattr(vs.index, "hnsw", None)
+        if hnsw is not None:
+            hnsw.efSearch = HNSW_EF_SEARCH
+        if hasattr(vs.index, "nprobe"):
+            vs.index.nprobe = IVF_NPROBE
+    with contextlib.suppress(Exception):
+        # direct map 없이 저장된 IVF 인덱스(이전 빌드)는 MMR의 reconstruct가 실패하므로 로드 시 만들어 둠
+        import faiss  # type: ignore
+        ivf = faiss.try_extract_index_ivf(vs.index)
+        if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+            ivf.make_direct_map()
+    return vs
+
+def _load_vectorstore_mmap() -> Optional[FAISS]:
+    """index.faiss를 mmap(읽기 전용)으로 열어 벡터 데이터는 OS가 필요할 때만 페이지 인.
+    워커 여러 개가 같은 페이지를 공유한다. 지원되지 않는 인덱스/빌드면 None."""
+    try:
+        import faiss  # type: ignore
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+        index = faiss.read_index(str(Path(INDEX_DIR) / "index.faiss"), flags)
+        # docstore/id 매핑은 FAISS.save_local이 쓴 index.pkl 그대로
+        with open(Path(INDEX_DIR) / "index.pkl", "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+    except Exception:
+        return None
+    return FAISS(get_embedder(), index, docstore, index_to_docstore_id)
 
 @lru_cache(maxsize=1)
 def get_vectorstore():
-    return FAISS.load_local(
+    set_faiss_threads()
+    vs = _load_vectorstore_mmap()
+    if vs is not None:
+        return _tune_vectorstore(vs)
+    return _tune_vectorstore(FAISS.load_local(
         INDEX_DIR,
         get_embedder(),
         allow_dangerous_deserialization=True,
-    )
+    ))
 
-def _bm25_docs_from_vs(vs) -> List[Document]:
-    out: List[Document] = []
+def _bm25_head(meta: Dict) -> str:
+    return " ".join(str(meta.get(k, "")) for k in ("title", "section", "category") if meta.get(k)).strip()
+
+def _bm25_corpus(vs) -> List[Tuple[str, str, Dict]]:
+    """(제목 접두어, 본문, 메타) — 접두어는 문서당 한 번만 만든다"""
+    out: List[Tuple[str, str, Dict]] = []
     for doc in vs.docstore._dict.values():
         meta = doc.metadata or {}
-        head = " ".join(str(meta.get(k, "")) for k in ("title", "section", "category") if meta.get(k)).strip()
-        prefix = f"{head}\n" if head else ""
-        out.append(Document(page_content=prefix + doc.page_content, metadata=meta))
+        head = _bm25_head(meta)
+        out.append((f"{head}\n" if head else "", doc.page_content, meta))
     return out
 
+def _bm25_docs_from_vs(vs) -> List[Document]:
+    return [Document(page_content=prefix + body, metadata=meta) for prefix, body, meta in _bm25_corpus(vs)]
+
+class _BM25TopK(BM25Retriever):
+    """BM25Retriever와 같은 점수(BM25Okapi)를 역색인 + NumPy로 계산.
+
+    rank_bm25의 get_scores는 질의 토큰마다 전체 문서를 파이썬 루프로 돌고
+    get_top_n은 전체 argsort를 하므로, 토큰별 포스팅(문서 idx, tf) 배열만 더하고
+    상위 k는 np.argpartition으로 고른다.
+    """
+
+    postings: Any = None
+
+    def _build_postings(self) -> Tuple[Dict[str, Tuple[np.ndarray, np.ndarray]], np.ndarray]:
+        bm = self.vectorizer
+        lists: Dict[str, Tuple[List[int], List[int]]] = {}
+        for i, freqs in enumerate(bm.doc_freqs):
+            for term, tf in freqs.items():
+                idx, tfs = lists.setdefault(term, ([], []))
+                idx.append(i)
+                tfs.append(tf)
+        postings = {
+            t: (np.asarray(idx, dtype=np.intp), np.asarray(tfs, dtype=np.float64))
+            for t, (idx, tfs) in lists.items()
+        }
+        norm = bm.k1 * (1 - bm.b + bm.b * np.asarray(bm.doc_len, dtype=np.float64) / bm.avgdl)
+        return postings, norm
+
+    def _get_relevant_documents(self, query: str, *, run_manager) -> List[Document]:
+        n = len(self.docs)
+        k = min(self.k, n)
+        if k <= 0:
+            return []
+        if self.postings is None:
+            self.postings = self._build_postings()
+        postings, norm = self.postings
+        bm = self.vectorizer
+        scores = np.zeros(n, dtype=np.float64)
+        for q in self.preprocess_func(query):
+            hit = postings.get(q)
+            if hit is None:
+                continue
+            idx, tf = hit
+            scores[idx] += (bm.idf.get(q) or 0) * (tf * (bm.k1 + 1) / (tf + norm[idx]))
+        top = np.argpartition(-scores, k - 1)[:k] if k < n else np.arange(n)
+        top = np.sort(top)
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [self.docs[i] for i in top]
+
+# BM25 코퍼스 디스크 캐시: index.faiss mtime이 같으면 토큰화 생략하고 그대로 로드
+_BM25_CACHE = Path(INDEX_DIR) / "bm25.pkl"
+
+def _faiss_mtime() -> Optional[float]:
+    with contextlib.suppress(OSError):
+        return (Path(INDEX_DIR) / "index.faiss").stat().st_mtime
+    return None
+
+def _load_bm25_cache(mtime: float) -> Optional[BM25Retriever]:
+    with contextlib.suppress(Exception):
+        with open(_BM25_CACHE, "rb") as f:
+            cached_mtime, vectorizer, docs = pickle.load(f)
+        if cached_mtime == mtime:
+            return _BM25TopK(vectorizer=vectorizer, docs=docs, k=RETRIEVER_K)
+    return None
+
+def _save_bm25_cache(mtime: float, bm25: BM25Retriever):
+    with contextlib.suppress(Exception):
+        tmp = _BM25_CACHE.with_suffix(".pkl.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump((mtime, bm25.vectorizer, bm25.docs), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, _BM25_CACHE)
+
+def _build_bm25(vs) -> BM25Retriever:
+    bm25 = _BM25TopK.from_documents(_bm25_docs_from_vs(vs))
+    bm25.k = RETRIEVER_K
+    return bm25
+
+def _get_bm25(vs) -> BM25Retriever:
+    mtime = _faiss_mtime()
+    if mtime is None:
+        return _build_bm25(vs)
+    try:
+        lock = open(_BM25_CACHE.with_suffix(".lock"), "a")
+    except OSError:
+        # 인덱스 디렉터리에 쓸 수 없으면 캐시 없이 빌드
+        return _load_bm25_cache(mtime) or _build_bm25(vs)
+    with lock:
+        # 여러 워커가 동시에 뜰 때 한 워커만 빌드하고 나머지는 결과를 읽는다
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        bm25 = _load_bm25_cache(mtime)
+        if bm25 is None:
+            bm25 = _build_bm25(vs)
+            _save_bm25_cache(mtime, bm25)
+        return bm25
+
+def _doc_key(doc: Document) -> Tuple:
+    """리트리버 간 같은 청크 판별용 키 (BM25 문서의 제목 접두어는 떼고 비교)"""
+    meta = doc.metadata or {}
+    text = doc.page_content
+    head = _bm25_head(meta)
+    if head and text.startswith(head + "\n"):
+        text = text[len(head) + 1:]
+    return text, tuple(sorted((str(k), repr(v)) for k, v in meta.items()))
+
+class WeightedFusionRetriever(BaseRetriever):
+    """하위 리트리버 결과를 가중 RRF(sum w / (c + rank))로 합친다.
+
+    MergerRetriever는 결과를 번갈아 끼워 넣기만 해서 weights가 반영되지 않았다.
+    """
+
+    retrievers: List[BaseRetriever]
+    weights: List[float]
+    c: int = 60
+    k: Optional[int] = None  # None이면 합친 결과 전부
+
+    def _get_relevant_documents(self, query: str, *, run_manager) -> List[Document]:
+        results = [
+            r.invoke(query, config={"callbacks": run_manager.get_child(f"retriever_{i + 1}")})
+            for i, r in enumerate(self.retrievers)
+        ]
+        pos: Dict[Tuple, int] = {}
+        docs: List[Document] = []
+        ids: List[int] = []
+        contrib: List[float] = []
+        for w, res in zip(self.weights, results):
+            for rank, d in enumerate(res, start=1):
+                key = _doc_key(d)
+                i = pos.get(key)
+                if i is None:
+                    i = pos[key] = len(docs)
+                    docs.append(d)
+                ids.append(i)
+                contrib.append(w / (self.c + rank))
+        n = len(docs)
+        if n == 0:
+            return []
+        scores = np.zeros(n, dtype=np.float64)
+        np.add.at(scores, np.asarray(ids, dtype=np.intp), np.asarray(contrib, dtype=np.float64))
+        k = n if self.k is None else min(self.k, n)
+        top = np.argpartition(-scores, k - 1)[:k] if k < n else np.arange(n)
+        top = np.sort(top)
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [docs[i] for i in top]
+
 @lru_cache(maxsize=1)
 def get_retriever():
     vs = get_vectorstore()
     vect_ret = vs.as_retriever(search_type="mmr", search_kwargs={"k": RETRIEVER_K})
 
-    bm25_docs = _bm25_docs_from_vs(vs)
-    bm25 = BM25Retriever.from_documents(bm25_docs)
-    bm25.k = RETRIEVER_K
+    bm25 = _get_bm25(vs)
 
-    return MergerRetriever(
+    return WeightedFusionRetriever(
         retrievers=[vect_ret, bm25],
         weights=[VEC_WEIGHT, BM25_WEIGHT],
     )
@@ -3,6 +3,8 @@ from __future__ import annotations
 import re
 from typing import Dict, List, Tuple
 
+from app.rag.matcher import KeywordMatcher
+
 # 정적 경로: 무조건 /static 사용 (config 있으면 따라가고, 없으면 /static 유지)
 try:
     from app.config import STATIC_URL_PREFIX, PUBLIC_BASE_URL
@@ -23,12 +25,16 @@ FIELD_HINTS = {
     "goals":  re.compile(r"(목표|지향|비전)", re.IGNORECASE),
     "main":   re.compile(r"(주요\s*사업|무엇을|무슨\s*사업|내용)", re.IGNORECASE),
 }
+# 위 힌트를 이름 그룹 하나의 정규식으로 합쳐 질의를 한 번만 훑는다.
+# 전방탐색으로 감싸 겹치는 매치(예: '주요 사업지구')도 놓치지 않는다.
+_FIELD_RE = re.compile(
+    "(?=" + "|".join(f"(?P<{k}>{pat.pattern})" for k, pat in FIELD_HINTS.items()) + ")",
+    re.IGNORECASE,
+)
+
 def want_fields(q: str) -> List[str]:
-    out: List[str] = []
-    for k, pat in FIELD_HINTS.items():
-        if pat.search(q or ""):
-            out.append(k)
-    return out
+    found = {m.lastgroup for m in _FIELD_RE.finditer(q or "")}
+    return [k for k in FIELD_HINTS if k in found]
 
 # 사업 데이터 (이미지는 전부 /static)
 BUSINESS: Dict[str, Dict] = {
@@ -130,22 +136,21 @@ BUSINESS: Dict[str, Dict] = {
     },
 }
 
-def _score_hit(q: str, meta: Dict) -> int:
-    ql = (q or "").lower()
-    s = 0
-    for a in meta.get("aliases", []):
-        if a and a.lower() in ql:
-            s += 3
-    if meta["title"].lower() in ql:
-        s += 5
-    return s
+# 별칭(+3)/제목(+5) → 사업 키 매처: 질의를 한 번만 훑어 점수를 모은다
+_HIT_MATCHER = KeywordMatcher(
+    [(a.lower(), (k, 3)) for k, m in BUSINESS.items() for a in m.get("aliases", []) if a]
+    + [(m["title"].lower(), (k, 5)) for k, m in BUSINESS.items()]
+)
+
+def _score_hits(q: str) -> Dict[str, int]:
+    scores: Dict[str, int] = {}
+    for _, (k, w) in _HIT_MATCHER.find((q or "").lower()):
+        scores[k] = scores.get(k, 0) + w
+    return scores
 
 def _guess_keys(q: str) -> List[str]:
-    hits: List[Tuple[str, int]] = []
-    for k, m in BUSINESS.items():
-        sc = _score_hit(q, m)
-        if sc > 0:
-            hits.append((k, sc))
+    scores = _score_hits(q)
+    hits: List[Tuple[str, int]] = [(k, scores[k]) for k in BUSINESS if scores.get(k, 0) > 0]
     if not hits:
         return ["overview"]
     hits.sort(key=lambda x: x[1], reverse=True)
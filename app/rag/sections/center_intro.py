@@ -1,7 +1,11 @@
 from __future__ import annotations
 import re
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import accumulate
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 # 크롤링 산출물 경로 (config.CLEAN_DIR에서 주입될 수 있음)
 DEFAULT_CLEAN_DIR = Path("app/data/clean")
@@ -13,6 +17,24 @@ SECTION_ANCHORS = {
     "목표비전": ["목표", "비전", "목표와비전", "비전과목표"],
 }
 
+# 앵커 패턴은 import 시 한 번만 컴파일
+# - 공백은 줄바꿈을 제외해서(splitlines 기준) 전체 텍스트에 finditer 해도 줄 단위 매칭과 같게
+_WS = r"[^\S\n\r\x0b\x0c\x1c-\x1e\x85\u2028\u2029]"
+
+
+def _anchor_pat(a: str) -> str:
+    return rf"(?:#{_WS}*{a}\b|{a}{_WS}*[:：])"
+
+
+# 섹션별: (전체 앵커를 합친 패턴, 앵커별 패턴 목록)
+_SECTION_PATTERNS: Dict[str, Tuple[re.Pattern, List[re.Pattern]]] = {
+    sec: (
+        re.compile("|".join(_anchor_pat(a) for a in anchors), re.IGNORECASE),
+        [re.compile(_anchor_pat(a), re.IGNORECASE) for a in anchors],
+    )
+    for sec, anchors in SECTION_ANCHORS.items()
+}
+
 # OCR이 없거나 부족한 경우 대비한 안전한 Fallback
 FALLBACK_TEXT: Dict[str, List[str]] = {
     "인사말": [
@@ -32,36 +54,77 @@ FALLBACK_TEXT: Dict[str, List[str]] = {
 }
 
 
+_READ_WORKERS = 8
+
+
+def _read_md(md: Path) -> Optional[Tuple[str, str]]:
+    try:
+        return str(md), md.read_text(encoding="utf-8", errors="ignore")
+    except Exception:
+        return None
+
+
 def _read_all_md(clean_dir: Path) -> List[Tuple[str, str]]:
-    out: List[Tuple[str, str]] = []
     if not clean_dir.exists():
-        return out
+        return []
+    paths = list(clean_dir.glob("**/*.md"))
+    if len(paths) <= 1:
+        results = map(_read_md, paths)
+    else:
+        # 작은 파일이 많을 때 디스크 I/O를 겹치도록 스레드풀로 읽기 (순서는 glob 순서 유지)
+        with ThreadPoolExecutor(max_workers=min(_READ_WORKERS, len(paths))) as ex:
+            results = list(ex.map(_read_md, paths))
+    return [r for r in results if r is not None]
+
+
+def _md_signature(clean_dir: Path) -> Tuple[Tuple[str, int], ...]:
+    """(경로, mtime_ns) 목록 — 파일 추가/삭제/수정 시 달라짐"""
+    if not clean_dir.exists():
+        return ()
+    sig = []
     for md in clean_dir.glob("**/*.md"):
         try:
-            txt = md.read_text(encoding="utf-8", errors="ignore")
-            out.append((str(md), txt))
-        except Exception:
+            sig.append((str(md), md.stat().st_mtime_ns))
+        except OSError:
             continue
-    return out
+    return tuple(sorted(sig))
 
 
 def build_center_intro_index(clean_dir: Path = DEFAULT_CLEAN_DIR) -> Dict[str, List[str]]:
     """
     크롤링된 마크다운에서 섹션별 블록을 대략적으로 모아 둡니다.
+    (마크다운 파일 시그니처가 같으면 캐시된 결과 사용)
     """
+    clean_dir = Path(clean_dir)
+    buckets = _build_center_intro_index(clean_dir, _md_signature(clean_dir))
+    # 캐시 원본이 바뀌지 않도록 리스트는 복사해서 반환
+    return {k: list(v) for k, v in buckets.items()}
+
+
+@lru_cache(maxsize=4)
+def _build_center_intro_index(clean_dir: Path, sig: Tuple[Tuple[str, int], ...]) -> Dict[str, List[str]]:
     buckets: Dict[str, List[str]] = {k: [] for k in SECTION_ANCHORS.keys()}
     for _, txt in _read_all_md(clean_dir):
-        for sec_key, anchors in SECTION_ANCHORS.items():
-            for a in anchors:
-                # 간단한 헤더/문장 매칭
-                if re.search(rf"(#\s*{a}\b|{a}\s*[:：])", txt, flags=re.IGNORECASE):
-                    # 해당 줄부터 20줄 정도 떼오기
-                    lines = txt.splitlines()
-                    for i, line in enumerate(lines):
-                        if re.search(rf"(#\s*{a}\b|{a}\s*[:：])", line, flags=re.IGNORECASE):
-                            snippet = "\n".join(lines[i : i + 20]).strip()
-                            if snippet and snippet not in buckets[sec_key]:
-                                buckets[sec_key].append(snippet)
+        lines = None
+        for sec_key, (sec_pat, anchor_pats) in _SECTION_PATTERNS.items():
+            # 섹션 앵커가 하나도 없으면 건너뜀
+            if not sec_pat.search(txt):
+                continue
+            if lines is None:
+                lines = txt.splitlines()
+                # 줄 시작 오프셋 (매치 위치 → 줄 번호)
+                starts = [0, *accumulate(len(l) for l in txt.splitlines(keepends=True))]
+            for pat in anchor_pats:
+                # 해당 줄부터 20줄 정도 떼오기 (한 줄에 여러 번 매치돼도 한 번만)
+                prev = -1
+                for m in pat.finditer(txt):
+                    i = bisect_right(starts, m.start()) - 1
+                    if i == prev:
+                        continue
+                    prev = i
+                    snippet = "\n".join(lines[i : i + 20]).strip()
+                    if snippet and snippet not in buckets[sec_key]:
+                        buckets[sec_key].append(snippet)
     # Fallback 보강
     for k, v in FALLBACK_TEXT.items():
         if not buckets.get(k):
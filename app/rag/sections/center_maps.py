@@ -1,18 +1,24 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 import html
+from functools import lru_cache
 from typing import Dict, List, Tuple
 
+from app.rag.matcher import KeywordMatcher
+from app.rag.textnorm import no_space, normalize_query
+
 try:
     from app.config import STATIC_URL_PREFIX, CENTER_IMG_SUBDIR, PUBLIC_BASE_URL
 except Exception:
     STATIC_URL_PREFIX, CENTER_IMG_SUBDIR, PUBLIC_BASE_URL = "/static", "", ""
 
+# 이미지 URL 접두어는 설정값으로 한 번만 계산
+_BASE = STATIC_URL_PREFIX.rstrip("/")
+_SUB = ("/" + CENTER_IMG_SUBDIR.strip("/")) if CENTER_IMG_SUBDIR else ""
+_PREFIX = (PUBLIC_BASE_URL.rstrip("/") + _BASE) if PUBLIC_BASE_URL else _BASE
+
 def _img_url(filename: str) -> str:
-    base = STATIC_URL_PREFIX.rstrip("/")
-    sub  = ("/" + CENTER_IMG_SUBDIR.strip("/")) if CENTER_IMG_SUBDIR else ""
-    prefix = (PUBLIC_BASE_URL.rstrip("/") + base) if PUBLIC_BASE_URL else base
-    return f"{prefix}{sub}/{filename}"  
+    return f"{_PREFIX}{_SUB}/{filename}"
 
 
 
@@ -49,51 +55,85 @@ CENTER_MAPS: Dict[str, Dict] = {
     },
 }
 
-def _li_if(label: str, value: str) -> str:
-    v = (value or "").strip()
-    if not v:
+# 카드에 들어가는 필드는 import 시 한 번만 HTML 이스케이프 (<field>_esc 키로 저장)
+_LI_FIELDS: List[Tuple[str, str]] = [("주소", "address"), ("Tel", "tel"), ("Fax", "fax"), ("이메일", "email")]
+_LI_LABELS_ESC: Dict[str, str] = {label: html.escape(label) for label, _ in _LI_FIELDS}
+
+def _escape_fields(meta: Dict) -> Dict:
+    meta["title_esc"] = html.escape(meta["title"])
+    for _, f in _LI_FIELDS:
+        meta[f"{f}_esc"] = html.escape((meta.get(f) or "").strip())
+    return meta
+
+for _meta in CENTER_MAPS.values():
+    _escape_fields(_meta)
+
+def _li_if(label_esc: str, value_esc: str) -> str:
+    """이미 이스케이프된 라벨/값으로 <li> 생성 (값이 비면 생략)"""
+    if not value_esc:
         return ""
-    return f"<li><strong>{html.escape(label)}</strong>: {html.escape(v)}</li>"
+    return f"<li><strong>{label_esc}</strong>: {value_esc}</li>"
 
-def _guess_center_keys(q: str) -> List[str]:
-    q = (q or "").lower()
-    hits: List[Tuple[str, int]] = []
+def _center_keywords() -> List[Tuple[str, Tuple[str, int]]]:
+    """별칭은 NFKC·소문자·공백 제거 형태로 센터별 한 번만 (가중치 2), 센터 키는 가중치 1"""
+    pairs: List[Tuple[str, Tuple[str, int]]] = []
     for k, meta in CENTER_MAPS.items():
-        score = 0
-        for alias in meta["aliases"]:
-            if alias.lower() in q:
-                score += 2
-        if k in q:
-            score += 1
-        if score > 0:
-            hits.append((k, score))
-    hits.sort(key=lambda x: x[1], reverse=True)
-    return [k for k, _ in hits] if hits else list(CENTER_MAPS.keys())
+        for key in dict.fromkeys(no_space(normalize_query(a)) for a in meta["aliases"]):
+            pairs.append((key, (k, 2)))
+        pairs.append((k, (k, 1)))
+    return pairs
+
+# 질의 한 번 스캔으로 별칭/센터 키를 찾는 매처 ('봉명 센터'·'봉명센터'처럼 띄어쓰기는 무시)
+_CENTER_KEYWORDS = _center_keywords()
+_CENTER_MATCHER = KeywordMatcher(_CENTER_KEYWORDS)
+# 키워드 첫 글자 집합: 질의에 하나도 없으면 매칭할 필요 없음 (인사말/숫자만 있는 질의 등)
+_CENTER_STARTERS = frozenset(kw[0] for kw, _ in _CENTER_KEYWORDS if kw)
+
+_DEFAULT_KEYS: Tuple[str, ...] = tuple(CENTER_MAPS)
+
+def _guess_center_keys(q: str) -> Tuple[str, ...]:
+    # 정규화(no-space) 형태로 캐시해서 띄어쓰기/대소문자만 다른 질의도 같은 결과 재사용
+    return _center_keys_for(no_space(normalize_query(q or "")))
+
+@lru_cache(maxsize=1024)
+def _center_keys_for(qn: str) -> Tuple[str, ...]:
+    if _CENTER_STARTERS.isdisjoint(qn):
+        return _DEFAULT_KEYS
+    scores: Dict[str, int] = {}
+    for _, (k, w) in _CENTER_MATCHER.find(qn):
+        scores[k] = scores.get(k, 0) + w
+    # 매처가 센터 순서대로 키워드를 돌려주므로 scores도 CENTER_MAPS 순서 (동점 시 그 순서 유지)
+    if not scores:
+        return _DEFAULT_KEYS
+    if len(scores) == 1:
+        return tuple(scores)
+    return tuple(sorted(scores, key=scores.__getitem__, reverse=True))
 
 def find_map_images(query: str) -> List[Dict]:
-    keys = _guess_center_keys(query)
-    return [CENTER_MAPS[k] for k in keys if k in CENTER_MAPS]
+    return [CENTER_MAPS[k] for k in _guess_center_keys(query) if k in CENTER_MAPS]
+
+def _render_block(m: Dict) -> str:
+    if "title_esc" not in m:
+        m = _escape_fields(dict(m))
+    title = m["title_esc"]
+    head = f"<h3>{title}</h3>"
+    # 주의: 일부 렌더러가 onerror 속성을 막을 수 있어 단순 <img>만 둡니다.
+    img  = (
+        f'<div style="margin:8px 0 6px">'
+        f'<img src="{m["img"]}" alt="{title}" '
+        f'style="max-width:100%;border-radius:10px;box-shadow:0 2px 8px rgba(0,0,0,.08);display:block;">'
+        f"</div>"
+    )
+    lis = "".join(_li_if(_LI_LABELS_ESC[label], m[f"{f}_esc"]) for label, f in _LI_FIELDS)
+    ul = f"<ul>{lis}</ul>" if lis else ""
+    # 🔥 카드 내부의 '자세히' 링크는 제거합니다 (상단 url.py 링크 하나만 노출)
+    return head + img + ul
+
+# 센터 카드는 정적 데이터라 import 시 한 번만 렌더링 (id(meta) → 카드 HTML)
+_RENDERED_BLOCKS: Dict[int, str] = {id(m): _render_block(m) for m in CENTER_MAPS.values()}
 
 def render_map_html(items: List[Dict]) -> str:
     if not items:
         return ""
-    blocks = []
-    for m in items:
-        head = f"<h3>{html.escape(m['title'])}</h3>"
-        # 주의: 일부 렌더러가 onerror 속성을 막을 수 있어 단순 <img>만 둡니다.
-        img  = (
-            f'<div style="margin:8px 0 6px">'
-            f'<img src="{m["img"]}" alt="{html.escape(m["title"])}" '
-            f'style="max-width:100%;border-radius:10px;box-shadow:0 2px 8px rgba(0,0,0,.08);display:block;">'
-            f"</div>"
-        )
-        lis = "".join([
-            _li_if("주소",  m.get("address", "")),
-            _li_if("Tel",  m.get("tel", "")),
-            _li_if("Fax",  m.get("fax", "")),
-            _li_if("이메일", m.get("email", "")),
-        ])
-        ul = f"<ul>{lis}</ul>" if lis else ""
-        # 🔥 카드 내부의 '자세히' 링크는 제거합니다 (상단 url.py 링크 하나만 노출)
-        blocks.append(head + img + ul)
+    blocks = [_RENDERED_BLOCKS.get(id(m)) or _render_block(m) for m in items]
     return "<div>" + "<hr>".join(blocks) + "</div>"
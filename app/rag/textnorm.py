@@ -2,7 +2,9 @@
 from __future__ import annotations
 import re
 import unicodedata
-from typing import List
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Tuple, Union
 
 # 한국어/영문 질의 공통 정규화기
 
@@ -18,35 +20,73 @@ _JOIN_PATTS: List[tuple[re.Pattern, str]] = [
     (re.compile(r"(url)\s*(줘|달아|알려)", re.IGNORECASE), "URL 줘"),
 ]
 
+# 붙여쓰기 패턴들을 하나의 정규식으로 합쳐 질의를 한 번만 스캔 (그룹 이름 → 치환 문자열)
+# 패턴끼리 겹쳐 매치될 수 없어서 순서대로 sub 하던 것과 결과가 같다
+_JOIN_RE = re.compile("|".join(
+    f"(?P<j{i}>(?i:{p.pattern}))" if p.flags & re.IGNORECASE else f"(?P<j{i}>{p.pattern})"
+    for i, (p, _) in enumerate(_JOIN_PATTS)
+))
+_JOIN_REPS: Dict[str, str] = {f"j{i}": rep for i, (_, rep) in enumerate(_JOIN_PATTS)}
+
+def _join_rep(m: re.Match) -> str:
+    return _JOIN_REPS[m.lastgroup]
+
+# 순수 함수라 같은 질의가 반복되면 결과를 재사용 (strip_noise는 중간 문자열이 다양해 캐시 안 함)
+@lru_cache(maxsize=4096)
 def nfkc(s: str) -> str:
     return unicodedata.normalize("NFKC", s or "")
 
+# NBSP/제로폭/구두점 → 공백을 str.translate 한 번으로 처리
+_NOISE_TBL = str.maketrans({c: " " for c in "\u00A0" + _ZWSP + _PUNCS})
+_WS_RE = re.compile(r"\s+")
+
 def strip_noise(s: str) -> str:
-    s = (s or "").replace("\u00A0", " ")
-    for ch in _ZWSP:
-        s = s.replace(ch, " ")
-    s = re.sub(rf"[{re.escape(_PUNCS)}]", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+    return _WS_RE.sub(" ", (s or "").translate(_NOISE_TBL)).strip()
 
+@lru_cache(maxsize=2048)
 def normalize_query(s: str) -> str:
     """질의 해석용: 대소문자/구두점/제로폭/붙임표 통일 + 흔한 붙여쓰기 복원"""
     s = nfkc(s)
     s = strip_noise(s.lower())
-    for p, rep in _JOIN_PATTS:
-        s = p.sub(rep, s)
-    return s
+    return _JOIN_RE.sub(_join_rep, s)
+
+# 정규식 \s 와 같은 공백 문자 집합(모두 U+3000 이하)을 지우는 변환표
+_WS_REMOVE = dict.fromkeys((i for i in range(0x3001) if _WS_RE.match(chr(i))), None)
 
+@lru_cache(maxsize=4096)
 def no_space(s: str) -> str:
     """비교용: 공백 완전 제거 버전(띄어쓰기 무시 매칭)"""
-    return re.sub(r"\s+", "", s or "")
+    return (s or "").translate(_WS_REMOVE)
+
+@dataclass(frozen=True)
+class NormalizedQuery:
+    """한 번 정규화한 질의: 원문 / normalize_query / no_space
+    의도 분류·별칭·태그 매칭에 그대로 넘겨 같은 질의를 매번 다시 정규화하지 않게 한다."""
+    raw: str
+    norm: str
+    no_space: str
+
+def make_nq(q: Union["NormalizedQuery", str]) -> NormalizedQuery:
+    """문자열이면 정규화해 묶고, 이미 NormalizedQuery면 그대로"""
+    if isinstance(q, NormalizedQuery):
+        return q
+    n = normalize_query(q)
+    return NormalizedQuery(q or "", n, no_space(n))
+
+# 공백 + strip_noise가 지우는 구두점을 한 번에 제거하는 변환표
+_COMPACT_TBL = str.maketrans("", "", " \t\n\r\x0b\x0c\u00A0\u3000" + _ZWSP + _PUNCS)
+
+def compact(s: str) -> str:
+    """비교용: 공백/구두점 제거 (이미 정규화된 문자열이면 no_space(normalize_query(s))와 같음)"""
+    return (s or "").translate(_COMPACT_TBL)
 
-def make_alias_variants(phrase: str) -> List[str]:
-    """별칭 하나로부터, 띄어쓰기·케이싱 다양한 변형을 만들어 풀에 넣는다."""
+@lru_cache(maxsize=4096)
+def make_alias_variants(phrase: str) -> Tuple[str, ...]:
+    """별칭 하나로부터, 띄어쓰기·케이싱 다양한 변형을 만들어 풀에 넣는다.
+    중복 없는 튜플을 고정 순서로 돌려줌 (set 순서에 따라 풀 순서가 실행마다 바뀌지 않도록)"""
     if not phrase:
-        return []
+        return ()
     base = nfkc(phrase)
-    cand = {base, base.lower(), strip_noise(base), strip_noise(base.lower())}
+    lower = base.lower()
     # 공백제거 버전도 추가
-    cand.add(no_space(base))
-    return list(cand)
+    return tuple(dict.fromkeys((base, lower, strip_noise(base), strip_noise(lower), no_space(base))))
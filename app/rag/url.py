@@ -10,11 +10,15 @@ url.py — 천안URC '링크/주소/URL' 고도화 라우터 (외부 사용자 
 
 from __future__ import annotations
 
+import heapq
 import html
 import re
+import sys
 import unicodedata
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
+from itertools import accumulate
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
 # ============== 정규화 & 유틸 ==============
 
@@ -24,29 +28,52 @@ _POLITE_SUFFIX = re.compile(
 _ENDING_NOISE = re.compile(
     r"(이[야요]?$|인가요\??$|인가요$|인가$|뭐[야요]?$|알려줘(요)?$|알려[ ]?주세요$|가르쳐줘(요)?$|보여줘(요)?$|찾아줘(요)?$)"
 )
-_PUNCT = re.compile(r"[?!.,;:~…·/\\]+")
-_WS = re.compile(r"\s+")
+# 구두점 → 공백 (문자 단위 치환이라 정규식 대신 translate 한 번)
+_PUNCT_TABLE = str.maketrans({c: " " for c in "?!.,;:~…·/\\"})
 _REQ_TRAILER = re.compile(r"(링크|url|주소|홈페이지|페이지|사이트|경로|어디|바로가기)$", re.IGNORECASE)
-_NUM_EXTRACT = re.compile(
-    r"\b(\d{2,3})\b|/(new|41|64|78|97|98|99|100|24|79|101|25|131|133|128|68|27|71|70|72|74|75|73|140|92|95|121|36|35|37|108)\b",
-    re.IGNORECASE,
+# 위 세 꼬리 패턴(요청어 → 어미 → 공손 표현 순으로 붙는 꼬리)을 한 번에 떼는 결합 패턴
+# 줄바꿈이 없으면 세 번 차례로 sub 한 결과와 같다 ('$'가 끝 줄바꿈 앞에서도 맞는 경우만 다름)
+_TRAILERS = re.compile(
+    r"(?i:링크|url|주소|홈페이지|페이지|사이트|경로|어디|바로가기)?"
+    r"(?:이[야요]?|인가요\??|인가요|인가|뭐[야요]?|알려줘(?:요)?|알려[ ]?주세요|가르쳐줘(?:요)?|보여줘(?:요)?|찾아줘(?:요)?)?"
+    r"(?:좀|조금|구체적으로|자세히|정확히|빨리|빠르게|바로|지금|가능해\??|가능한가요\??|가능할까요\??|한번|한 번)?$"
 )
+# 페이지 ID 추출: 질의 정규 토큰(_qtoks)을 재사용해 단어(\w+) 단위로 보고
+# - 2~3자리 숫자 단어는 그대로 후보
+# - '/new', '/41' 처럼 슬래시 바로 뒤 단어는 알려진 ID 집합에 있을 때만 후보
+_WORD = re.compile(r"\w+")
+_KNOWN_IDS = frozenset({
+    "new", "41", "64", "78", "97", "98", "99", "100", "24", "79", "101", "25", "131", "133", "128",
+    "68", "27", "71", "70", "72", "74", "75", "73", "140", "92", "95", "121", "36", "35", "37", "108",
+})
 
 def _nfkc(s: str) -> str:
     return unicodedata.normalize("NFKC", s or "")
 
+def _strip_trailers(s: str) -> str:
+    """NFKC + 끝의 요청어/어미/공손 표현 제거 (구두점·공백 정리 전 단계)"""
+    # ASCII는 NFKC 결과가 항상 자기 자신이라 정규화 생략 ('131', '/41', 'new' 등)
+    if not s.isascii():
+        s = _nfkc(s)
+    s = s.strip()
+    if "\n" in s:
+        s = _POLITE_SUFFIX.sub("", s)
+        s = _ENDING_NOISE.sub("", s)
+        s = _REQ_TRAILER.sub("", s)
+    else:
+        s = _TRAILERS.sub("", s)
+    return s
+
+@lru_cache(maxsize=4096)
 def _normalize(s: str) -> str:
-    """정확/토큰 매칭 공통 정규화 텍스트."""
+    """정확/토큰 매칭 공통 정규화 텍스트. (질의·제목 반복 정규화는 캐시)"""
     if not s:
         return ""
-    s = _nfkc(s).strip()
-    s = _POLITE_SUFFIX.sub("", s)
-    s = _ENDING_NOISE.sub("", s)
-    s = _REQ_TRAILER.sub("", s)
-    s = _PUNCT.sub(" ", s)
-    s = _WS.sub(" ", s).strip().lower()
-    return s
+    s = _strip_trailers(s)
+    # split()/join으로 공백 연속을 하나로 접고 양끝을 정리
+    return " ".join(s.translate(_PUNCT_TABLE).split()).lower()
 
+@lru_cache(maxsize=256)
 def _anchor(url: str, label: Optional[str] = None) -> str:
     u = url if url.startswith(("http://", "https://")) else f"https://{url}"
     lab = label or u
@@ -102,31 +129,56 @@ SYN: Dict[str, str] = {
 KNUM = {"일": "1", "이": "2", "삼": "3", "하나": "1", "둘": "2", "셋": "3"}
 
 SECTION_KEYS = ["센터소개", "사업소개", "도시재생+", "커뮤니티", "아카이브"]
-BROADCAST_HINTS = {"목록", "전체", "전부", "다", "정리", "한번에", "한번에", "한 눈에", "목차", "메뉴", "카테고리", "링크", "페이지", "주소", "url"}
-GENERIC_IGNORE = {"센터", "지원센터", "도시재생", "천안", "천안시"}  # 섹션 외 일반 단어
+BROADCAST_HINTS = frozenset({"목록", "전체", "전부", "다", "정리", "한번에", "한 눈에", "목차", "메뉴", "카테고리", "링크", "페이지", "주소", "url"})
+GENERIC_IGNORE = frozenset({"센터", "지원센터", "도시재생", "천안", "천안시"})  # 섹션 외 일반 단어
+
+# 고정 어휘는 intern: 정규 토큰이 같은 객체가 되어 집합/사전 비교가 동일성 검사로 끝남
+SYN = {sys.intern(k): sys.intern(v) for k, v in SYN.items()}
+KNUM = {sys.intern(k): sys.intern(v) for k, v in KNUM.items()}
+SECTION_KEYS = [sys.intern(s) for s in SECTION_KEYS]
+BROADCAST_HINTS = frozenset(map(sys.intern, BROADCAST_HINTS))
+GENERIC_IGNORE = frozenset(map(sys.intern, GENERIC_IGNORE))
+
+# 섹션 키 → 비트 (SECTION_KEYS 순서; 가장 낮은 비트가 우선)
+_SECTION_BITS: Dict[str, int] = {s: 1 << i for i, s in enumerate(SECTION_KEYS)}
+
+# 숫자 우선(KNUM) → 동의어(SYN) 한 번의 조회로
+_SYN_KNUM: Dict[str, str] = {**SYN, **KNUM}
 
 def _canon_tokens(tokens: List[str]) -> List[str]:
-    out: List[str] = []
-    for t in tokens:
-        if t in KNUM:
-            out.append(KNUM[t]); continue
-        out.append(SYN.get(t, t))
-    return out
+    return [sys.intern(_SYN_KNUM.get(t, t)) for t in tokens]
+
+@lru_cache(maxsize=512)
+def _qtoks(query: str) -> Tuple[Tuple[str, ...], int]:
+    """질의 → (정규 토큰, 섹션 비트마스크). 정규화·분리·동의어 치환 1회, 브로드캐스트 감지와 매칭이 공유"""
+    toks = tuple(sys.intern(_SYN_KNUM.get(t, t)) for t in _normalize(query).split())
+    mask = 0
+    for t in toks:
+        mask |= _SECTION_BITS.get(t, 0)
+    return toks, mask
+
+# 코스 번호 추출: '(일반|전문)? 코스 [0-9일이삼]' (토큰 사이 공백 허용)을 토큰 위에서 직접 훑음
+_COURSE_NUM_CHARS = frozenset("0123456789일이삼")
+
+def _course_kind(head: str) -> Optional[str]:
+    if head.endswith("일반"):
+        return "일반코스"
+    if head.endswith("전문"):
+        return "전문코스"
+    return None
 
-# 코스 번호 추출
-_COURSE_RE = re.compile(r"(일반|전문)?\s*코스\s*([0-9일이삼])", re.IGNORECASE)
-
-def _extract_course(tokens: List[str]) -> Tuple[Optional[str], Optional[str]]:
-    s = " ".join(tokens)
-    m = _COURSE_RE.search(s)
-    if not m:
-        return None, None
-    kind = (m.group(1) or "").replace(" ", "")
-    num  = m.group(2)
-    num = KNUM.get(num, num)
-    if kind and kind.lower() in ("일반", "전문"):
-        kind = "일반코스" if kind == "일반" else "전문코스"
-    return kind, num
+def _extract_course(tokens: Sequence[str]) -> Tuple[Optional[str], Optional[str]]:
+    """처음으로 뒤에 번호가 붙은 '코스' → (코스 종류 또는 None, 번호)"""
+    for i, t in enumerate(tokens):
+        j = t.find("코스")
+        while j >= 0:
+            rest = t[j + 2:]
+            ch = rest[0] if rest else (tokens[i + 1][0] if i + 1 < len(tokens) else "")
+            if ch in _COURSE_NUM_CHARS:
+                head = t[:j] if j else (tokens[i - 1] if i else "")
+                return _course_kind(head), KNUM.get(ch, ch)
+            j = t.find("코스", j + 2)
+    return None, None
 
 # ============== 데이터 모델 ==============
 
@@ -144,6 +196,10 @@ class UrlEntry:
     aliases: List[str] = field(default_factory=list)
     page_ids: List[str] = field(default_factory=list)  # 숫자/식별자 매핑용
     _token_profiles: List[List[str]] = field(default_factory=list, repr=False)  # 인덱싱 캐시
+    _norm_title: str = field(default="", repr=False)  # _normalize(title) 캐시
+    _token_sets: List[frozenset] = field(default_factory=list, repr=False)  # 프로필별 토큰 집합(Jaccard용)
+    _token_joined: List[str] = field(default_factory=list, repr=False)  # 프로필별 공백 결합 문자열(RapidFuzz용)
+    _rendered_html: str = field(default="", repr=False)  # to_html() 결과 캐시 (내용이 고정이라 인덱스 구성 때 1회)
 
     def to_html(self) -> str:
         parts: List[str] = []
@@ -508,20 +564,39 @@ ENTRIES: List[UrlEntry] = [
 
 # ============== 인덱스 구성 + 섹션 브로드캐스트 ==============
 
+def _section_broadcast_html(section: str, items: List[UrlEntry]) -> str:
+    parts = [f"<strong>{html.escape(section)} 섹션 링크 모음</strong><br><br><ul>"]
+    for e in items:
+        first = e.links[0] if e.links else None
+        if not first:
+            continue
+        parts.append(f"<li><strong>{html.escape(e.title)}</strong><br>{_anchor(first.url, first.label or first.url)}</li>")
+    parts.append("</ul>")
+    return "".join(parts)
+
 class _Index:
     def __init__(self, entries: List[UrlEntry]):
         self.entries = entries
         self.phrase_map: Dict[str, UrlEntry] = {}
         self.id_map: Dict[str, UrlEntry] = {}
         self.section_map: Dict[str, List[UrlEntry]] = {s: [] for s in SECTION_KEYS}
+        # 대표문구/별칭의 정규 토큰 집합(정렬 튜플) → 엔트리 (어순/동의어만 다른 질의용)
+        self.token_map: Dict[Tuple[str, ...], UrlEntry] = {}
+        ambiguous: set = set()
 
         for e in entries:
+            e._norm_title = _normalize(e.title)
+            e._rendered_html = e.to_html()
             # 대표문구/별칭 → 정확일치 인덱스
             for ph in [e.q] + e.aliases:
                 k = _normalize(ph)
                 if k:
                     self.phrase_map[k] = e
-                    e._token_profiles.append(_canon_tokens(_tokenize(ph)))
+                    toks = _canon_tokens(_tokenize(ph))
+                    e._token_profiles.append(toks)
+                    tk = tuple(sorted(set(toks)))
+                    if tk and self.token_map.setdefault(tk, e) is not e:
+                        ambiguous.add(tk)
             # 숫자/식별자 → ID 인덱스
             for pid in e.page_ids:
                 self.id_map[str(pid).lower()] = e
@@ -529,25 +604,53 @@ class _Index:
             for extra in [e.title, e.answer]:
                 if extra:
                     e._token_profiles.append(_canon_tokens(_tokenize(extra)))
+            # 채점용 형태는 한 번만 만들어 둔다
+            e._token_sets = [frozenset(p) for p in e._token_profiles]
+            e._token_joined = [" ".join(p) for p in e._token_profiles]
 
             # 섹션 인덱스(제목 접두 "섹션 > " 기준)
             for section in SECTION_KEYS:
                 if e.title.startswith(f"{section} >"):
                     self.section_map[section].append(e)
 
+        # 여러 엔트리가 같은 토큰 집합을 가지면 토큰 경로로는 고르지 않음
+        for tk in ambiguous:
+            del self.token_map[tk]
+
+        # 섹션 브로드캐스트 결과는 고정이라 미리 만들어 둔다 (엔트리 없는 섹션은 없음 → None)
+        self.section_result: Dict[str, UrlResult] = {
+            sec: UrlResult(html=_section_broadcast_html(sec, items), hits=list(items))
+            for sec, items in self.section_map.items() if items
+        }
+
     def by_phrase(self, query: str) -> Optional[UrlEntry]:
         return self.phrase_map.get(_normalize(query))
 
-    def by_id(self, query: str) -> Optional[UrlEntry]:
-        m = _NUM_EXTRACT.findall(query)
-        if not m:
+    def by_token_path(self, qtoks: Sequence[str]) -> Optional[UrlEntry]:
+        """정규 토큰 집합이 어떤 별칭과 정확히 같으면 그 엔트리 (예: '오시는 길 봉명' = '봉명 오시는길')"""
+        return self.token_map.get(tuple(sorted(set(qtoks))))
+
+    def _id_hit(self, word: str, after_slash: bool) -> Optional[UrlEntry]:
+        key = word.lower()
+        if (len(word) in (2, 3) and word.isdecimal()) or (after_slash and key in _KNOWN_IDS):
+            return self.id_map.get(key)
+        return None
+
+    def by_id_tokens(self, qtoks: Sequence[str], query: str) -> Optional[UrlEntry]:
+        """qtoks: _qtoks(query). 슬래시가 없으면 토큰만 보고, 있으면('/new') 위치가 필요해 원문 단어를 훑음"""
+        if "/" in query:
+            text = _strip_trailers(query)
+            for m in _WORD.finditer(text):
+                e = self._id_hit(m.group(), m.start() > 0 and text[m.start() - 1] == "/")
+                if e is not None:
+                    return e
             return None
-        for num, ident in m:
-            key = (num or ident or "").lower()
-            if not key:
-                continue
-            if key in self.id_map:
-                return self.id_map[key]
+        for t in qtoks:
+            # 괄호·하이픈 등이 붙은 토큰('(131)', '041-417')만 단어로 다시 나눔
+            for w in ((t,) if t.isalnum() else _WORD.findall(t)):
+                e = self._id_hit(w, False)
+                if e is not None:
+                    return e
         return None
 
     def entries_in_section(self, section: str) -> List[UrlEntry]:
@@ -555,37 +658,25 @@ class _Index:
 
 _INDEX = _Index(ENTRIES)
 
-def _detect_section(tokens: List[str]) -> Optional[str]:
-    tset = set(tokens)
-    for s in SECTION_KEYS:
-        if s in tset:
-            return s
-    return None
+def _detect_section(section_mask: int) -> Optional[str]:
+    """질의에 든 섹션 중 SECTION_KEYS 순서로 첫 번째 (= 가장 낮은 비트)"""
+    if not section_mask:
+        return None
+    return SECTION_KEYS[(section_mask & -section_mask).bit_length() - 1]
 
-def _should_broadcast_section(tokens: List[str], section: str) -> bool:
+def _should_broadcast_section(tset: frozenset, section: str) -> bool:
     """섹션만 물었거나(또는 '목록/전체/링크/페이지/주소/url' 류 힌트) → 전체 나열"""
-    tset = set(tokens)
     if section not in tset:
         return False
     # 브로드캐스트 힌트가 있으면 무조건
-    if tset & BROADCAST_HINTS:
+    if not tset.isdisjoint(BROADCAST_HINTS):
         return True
     # 섹션 외 의미 있는 추가 토큰이 없으면(=섹션만 언급) 브로드캐스트
     others = tset - {section} - GENERIC_IGNORE
     return len(others) == 0
 
 def _render_section_broadcast(section: str) -> Optional[UrlResult]:
-    items = _INDEX.entries_in_section(section)
-    if not items:
-        return None
-    parts = [f"<strong>{html.escape(section)} 섹션 링크 모음</strong><br><br><ul>"]
-    for e in items:
-        first = e.links[0] if e.links else None
-        if not first:
-            continue
-        parts.append(f"<li><strong>{html.escape(e.title)}</strong><br>{_anchor(first.url, first.label or first.url)}</li>")
-    parts.append("</ul>")
-    return UrlResult(html="".join(parts), hits=items)
+    return _INDEX.section_result.get(section)
 
 # ============== 스코어링(오타/동의어/영문 혼용) ==============
 
@@ -595,108 +686,199 @@ try:
 except Exception:
     _HAS_RAPIDFUZZ = False
 
-def _jaccard(a: List[str], b: List[str]) -> float:
-    sa, sb = set(a), set(b)
+try:
+    import numpy as np
+    _HAS_NUMPY = True
+except Exception:
+    _HAS_NUMPY = False
+
+# 전체 엔트리 프로필을 한 번의 cdist로 채점 (rapidfuzz.process + numpy 필요)
+try:
+    from rapidfuzz import process as _rf_process
+    _HAS_CDIST = _HAS_RAPIDFUZZ and _HAS_NUMPY
+except Exception:
+    _HAS_CDIST = False
+
+# 평탄화한 프로필 목록과 엔트리별 시작 위치 (프로필 없는 엔트리는 점수 0)
+_ALL_PROFILES: List[str] = [p for e in ENTRIES for p in e._token_joined]
+_PROFILED: List[int] = [i for i, e in enumerate(ENTRIES) if e._token_joined]
+_PROFILE_STARTS: List[int] = list(accumulate((len(ENTRIES[i]._token_joined) for i in _PROFILED[:-1]), initial=0))
+
+def _jaccard(sa: frozenset, sb: frozenset) -> float:
     if not sa and not sb:
         return 0.0
     return len(sa & sb) / max(1, len(sa | sb))
 
-def _score_tokens(qtoks: List[str], profiles: List[List[str]]) -> float:
-    if not profiles:
+# qs/qset: 질의 토큰의 결합 문자열/집합 (질의당 한 번만 만들어 넘김)
+def _score_tokens_rf(qs: str, qset: frozenset, e: UrlEntry) -> float:
+    if not e._token_joined:
         return 0.0
-    if _HAS_RAPIDFUZZ:
-        qs = " ".join(qtoks)
-        return max(_rf_token_set_ratio(qs, " ".join(p)) for p in profiles) / 100.0
-    return max(_jaccard(qtoks, p) for p in profiles)
-
-def _domain_boost(qtoks: List[str], e: UrlEntry) -> float:
-    t = set(qtoks)
-    boost = 0.0
-    if any(k in t for k in ("instagram", "youtube", "band", "blog")):
-        title_s = _normalize(e.title)
-        if any(p in title_s for p in ("instagram", "youtube", "band", "blog")):
-            boost += 0.15
-    if "오시는길" in t and "오시는길" in _normalize(e.title):
-        boost += 0.15
-    if ("투어" in t or "코스" in t or "일반코스" in t or "전문코스" in t) and "투어" in _normalize(e.title):
-        boost += 0.10
-    if "프로그램신청" in t and "프로그램" in _normalize(e.title):
-        boost += 0.10
-    if "봉평지구" in t and "봉평" in _normalize(e.title):
-        boost += 0.05
-    if "오룡지구" in t and "오룡" in _normalize(e.title):
-        boost += 0.05
-    if "역세권" in t and "역세권" in _normalize(e.title):
-        boost += 0.05
-    return boost
-
-def _rule_match(qtoks: List[str]) -> Optional[UrlEntry]:
-    toks = set(qtoks)
-
-    # 오시는길 + 대상
-    if "오시는길" in toks:
-        # 센터
-        for e in ENTRIES:
-            if e.page_ids == ["131"] and ("센터" in toks or "천안시" in " ".join(qtoks)):
-                return e
-        # 봉평
-        for e in ENTRIES:
-            if e.page_ids == ["133"] and ("봉평지구" in toks or "봉명" in toks):
-                return e
-        # 오룡
-        for e in ENTRIES:
-            if e.page_ids == ["128"] and ("오룡지구" in toks or "오룡" in toks):
-                return e
+    return max(_rf_token_set_ratio(qs, p) for p in e._token_joined) / 100.0
 
-    # 프로그램 신청(도시재생+)
-    if "프로그램신청" in toks or ("프로그램" in toks and ({"신청","접수","모집"} & toks)):
-        for e in ENTRIES:
-            if e.page_ids == ["41"]:
-                return e
+def _score_tokens_jaccard(qs: str, qset: frozenset, e: UrlEntry) -> float:
+    if not e._token_sets:
+        return 0.0
+    return max(_jaccard(qset, p) for p in e._token_sets)
+
+# RapidFuzz 유무 분기는 import 시 한 번만
+_score_tokens = _score_tokens_rf if _HAS_RAPIDFUZZ else _score_tokens_jaccard
+_TOKEN_TH = 0.45 if _HAS_RAPIDFUZZ else 0.35  # 토큰 스코어링 채택 하한
+
+def _entry_token_scores(qs: str, cutoff: float = 0.0) -> List[float]:
+    """ENTRIES 순서대로 _score_tokens와 같은 값 (RapidFuzz 경로를 cdist 한 번으로)
+    cutoff(0~1) 미만 점수는 C 스코어러가 조기 종료하고 0으로 채움"""
+    out = [0.0] * len(ENTRIES)
+    if not _ALL_PROFILES:
+        return out
+    sim = _rf_process.cdist(
+        [qs], _ALL_PROFILES, scorer=_rf_token_set_ratio, dtype=np.float64, score_cutoff=cutoff * 100
+    )[0]
+    best = np.maximum.reduceat(sim, _PROFILE_STARTS)
+    for i, v in zip(_PROFILED, best.tolist()):
+        out[i] = v / 100.0
+    return out
 
-    # 투어 + (일반|전문)코스 + 번호
-    kind, num = _extract_course(qtoks)
-    if "투어" in toks:
-        if kind and num:
-            target = {
-                ("일반코스", "1"): "78",
-                ("일반코스", "2"): "97",
-                ("전문코스", "1"): "98",
-                ("전문코스", "2"): "99",
-                ("전문코스", "3"): "100",
-            }.get((kind, num))
-            if target:
-                for e in ENTRIES:
-                    if target in e.page_ids:
-                        return e
-        # 코스 미지정: 투어 안내
-        for e in ENTRIES:
-            if e.page_ids == ["64"]:
-                return e
+# RapidFuzz가 없을 때: 프로필을 어휘 비트마스크로 만들어 Jaccard를 NumPy로 한 번에 계산
+_HAS_BITS = _HAS_NUMPY and not _HAS_RAPIDFUZZ and bool(_ALL_PROFILES)
+
+if _HAS_BITS:
+    _VOCAB: Dict[str, int] = {}
+    for _e in ENTRIES:
+        for _ts in _e._token_sets:
+            for _t in _ts:
+                _VOCAB.setdefault(_t, len(_VOCAB))
+    _NWORDS = max(1, (len(_VOCAB) + 63) // 64)
+
+    def _encode_bits(tokens) -> "np.ndarray":
+        row = np.zeros(_NWORDS, dtype=np.uint64)
+        for t in tokens:
+            i = _VOCAB.get(t)
+            if i is not None:
+                row[i >> 6] |= np.uint64(1 << (i & 63))
+        return row
+
+    # ENTRIES 순서로 평탄화 (_ALL_PROFILES와 같은 순서)
+    _PROFILE_BITS = np.stack([_encode_bits(ts) for e in ENTRIES for ts in e._token_sets])
+
+    if hasattr(np, "bitwise_count"):  # NumPy 2.0+
+        _popcount = np.bitwise_count
+    else:
+        _M1, _M2, _M4, _H01 = (np.uint64(v) for v in (
+            0x5555555555555555, 0x3333333333333333, 0x0F0F0F0F0F0F0F0F, 0x0101010101010101))
+
+        def _popcount(x: "np.ndarray") -> "np.ndarray":
+            x = x - ((x >> np.uint64(1)) & _M1)
+            x = (x & _M2) + ((x >> np.uint64(2)) & _M2)
+            x = (x + (x >> np.uint64(4))) & _M4
+            return (x * _H01) >> np.uint64(56)
+
+def _entry_jaccard_scores(qset: frozenset) -> List[float]:
+    """ENTRIES 순서대로 _score_tokens_jaccard와 같은 값 (어휘 밖 질의 토큰은 합집합에만 더함)"""
+    out = [0.0] * len(ENTRIES)
+    q = _encode_bits(qset)
+    unknown = sum(1 for t in qset if t not in _VOCAB)
+    inter = _popcount(_PROFILE_BITS & q).sum(axis=1)
+    union = _popcount(_PROFILE_BITS | q).sum(axis=1) + unknown
+    sim = inter / np.maximum(union, 1)
+    best = np.maximum.reduceat(sim, _PROFILE_STARTS)
+    for i, v in zip(_PROFILED, best.tolist()):
+        out[i] = v
+    return out
+
+_PLATFORM_KEYS = frozenset(("instagram", "youtube", "band", "blog"))
+_TOUR_KEYS = frozenset(("투어", "코스", "일반코스", "전문코스"))
+
+# 도메인 가산 규칙: (질의 토큰 중 하나, 제목(정규화)에 들어갈 문자열 중 하나, 가산점) — 비트 i = 규칙 i
+_BOOST_RULES: List[Tuple[frozenset, Tuple[str, ...], float]] = [
+    (_PLATFORM_KEYS, tuple(_PLATFORM_KEYS), 0.15),
+    (frozenset(("오시는길",)), ("오시는길",), 0.15),
+    (_TOUR_KEYS, ("투어",), 0.10),
+    (frozenset(("프로그램신청",)), ("프로그램",), 0.10),
+    (frozenset(("봉평지구",)), ("봉평",), 0.05),
+    (frozenset(("오룡지구",)), ("오룡",), 0.05),
+    (frozenset(("역세권",)), ("역세권",), 0.05),
+]
+
+# 마스크별 가산점 합 (규칙 순서대로 더해 기존 누적합과 같은 부동소수 값)
+_BOOST_BY_MASK: List[float] = []
+for _m in range(1 << len(_BOOST_RULES)):
+    _b = 0.0
+    for _i, (_, _, _w) in enumerate(_BOOST_RULES):
+        if _m >> _i & 1:
+            _b += _w
+    _BOOST_BY_MASK.append(_b)
+
+def _title_flags(title_norm: str) -> int:
+    return sum(1 << i for i, (_, subs, _) in enumerate(_BOOST_RULES) if any(p in title_norm for p in subs))
+
+def _query_flags(t: frozenset) -> int:
+    """t: 질의 정규 토큰 집합 (질의당 한 번만 만들어 넘김)"""
+    return sum(1 << i for i, (keys, _, _) in enumerate(_BOOST_RULES) if not t.isdisjoint(keys))
+
+# ENTRIES 순서의 제목 플래그 (제목은 고정이라 import 시 1회)
+_TITLE_FLAGS: List[int] = [_title_flags(e._norm_title) for e in ENTRIES]
+
+def _domain_boost(qflags: int, e_flags: int) -> float:
+    return _BOOST_BY_MASK[qflags & e_flags]
+
+def _boost_bound(qflags: int) -> float:
+    """이 질의로 어떤 엔트리든 받을 수 있는 _domain_boost 최댓값 (제목 조건은 모두 참이라고 가정)"""
+    return _BOOST_BY_MASK[qflags]
+
+# page_id → 엔트리 (같은 ID가 여러 번이면 먼저 나온 것)
+_BY_PID: Dict[str, UrlEntry] = {}
+for _e in ENTRIES:
+    for _pid in _e.page_ids:
+        _BY_PID.setdefault(_pid, _e)
+
+_COURSE_PIDS: Dict[Tuple[str, str], str] = {
+    ("일반코스", "1"): "78",
+    ("일반코스", "2"): "97",
+    ("전문코스", "1"): "98",
+    ("전문코스", "2"): "99",
+    ("전문코스", "3"): "100",
+}
 
+_APPLY_WORDS = frozenset(("신청", "접수", "모집"))
+_GREETING_WORDS = frozenset(("인사말", "greeting"))
+_ORG_WORDS = frozenset(("조직", "조직도", "담당자"))
+_NEWS_WORDS = frozenset(("뉴스", "도시재생뉴스"))
+
+# 규칙 테이블: (조건(toks, qtoks, (코스 종류, 번호)), page_id) — 위에서부터 처음 맞는 규칙
+_RULES: List[Tuple[Callable[..., bool], str]] = [
+    # 오시는길 + 대상 (센터/봉평/오룡)
+    (lambda t, q, c: "오시는길" in t and ("센터" in t or "천안시" in " ".join(q)), "131"),
+    (lambda t, q, c: "오시는길" in t and ("봉평지구" in t or "봉명" in t), "133"),
+    (lambda t, q, c: "오시는길" in t and ("오룡지구" in t or "오룡" in t), "128"),
+    # 프로그램 신청(도시재생+)
+    (lambda t, q, c: "프로그램신청" in t or ("프로그램" in t and not t.isdisjoint(_APPLY_WORDS)), "41"),
+    # 투어 + (일반|전문)코스 + 번호
+    *[
+        (lambda t, q, c, _k=k: "투어" in t and c == _k, pid)
+        for k, pid in _COURSE_PIDS.items()
+    ],
+    # 코스 미지정: 투어 안내
+    (lambda t, q, c: "투어" in t, "64"),
     # 상하위 간단 조합
-    if "센터소개" in toks and ({"인사말","greeting"} & toks):
-        for e in ENTRIES:
-            if e.page_ids == ["24"]:
-                return e
-    if "센터소개" in toks and ({"조직","조직도","담당자"} & toks):
-        for e in ENTRIES:
-            if e.page_ids == ["25"]:
-                return e
-    if "아카이브" in toks and ({"발간물"} & toks):
-        for e in ENTRIES:
-            if e.page_ids == ["36"]:
-                return e
-    if "아카이브" in toks and ({"뉴스","도시재생뉴스"} & toks):
-        for e in ENTRIES:
-            if e.page_ids == ["35"]:
-                return e
+    (lambda t, q, c: "센터소개" in t and not t.isdisjoint(_GREETING_WORDS), "24"),
+    (lambda t, q, c: "센터소개" in t and not t.isdisjoint(_ORG_WORDS), "25"),
+    (lambda t, q, c: "아카이브" in t and "발간물" in t, "36"),
+    (lambda t, q, c: "아카이브" in t and not t.isdisjoint(_NEWS_WORDS), "35"),
+]
 
+def _rule_match(qtoks: Sequence[str], qset: frozenset) -> Optional[UrlEntry]:
+    course = _extract_course(qtoks)
+    for pred, pid in _RULES:
+        if pred(qset, qtoks, course):
+            e = _BY_PID.get(pid)
+            if e:
+                return e
     return None
 
-def _best_candidates(query: str) -> List[Tuple[UrlEntry, float]]:
+def _best_candidates(query: str, qtoks: Sequence[str], qset: frozenset) -> List[Tuple[UrlEntry, float]]:
+    """qtoks/qset: find_url_answer가 만든 질의 정규 토큰과 그 집합"""
     # 1) ID
-    hit = _INDEX.by_id(query)
+    hit = _INDEX.by_id_tokens(qtoks, query)
     if hit:
         return [(hit, 1.0)]
 
@@ -705,24 +887,34 @@ def _best_candidates(query: str) -> List[Tuple[UrlEntry, float]]:
     if hit:
         return [(hit, 0.98)]
 
-    # 3) 규칙
-    qtoks = _canon_tokens(_tokenize(query))
-    rule = _rule_match(qtoks)
+    # 3) 토큰 집합 일치
+    hit = _INDEX.by_token_path(qtoks)
+    if hit:
+        return [(hit, 0.97)]
+
+    # 4) 규칙
+    rule = _rule_match(qtoks, qset)
     if rule:
         return [(rule, 0.95)]
 
-    # 4) 토큰 스코어링
-    scored: List[Tuple[UrlEntry, float]] = []
-    for e in ENTRIES:
-        score = _score_tokens(qtoks, e._token_profiles) + _domain_boost(qtoks, e)
-        scored.append((e, score))
-    scored.sort(key=lambda x: x[1], reverse=True)
+    # 5) 토큰 스코어링
+    TH = _TOKEN_TH
+    qs = " ".join(qtoks)
+    qflags = _query_flags(qset)
+    if _HAS_CDIST:
+        # 가산점을 다 받아도 TH에 못 미칠 토큰 점수는 어차피 버려지므로 C 쪽에서 잘라냄 (0.5점 여유)
+        tok_scores = _entry_token_scores(qs, max(0.0, TH - _boost_bound(qflags) - 0.005))
+    elif _HAS_BITS:
+        tok_scores = _entry_jaccard_scores(qset)
+    else:
+        tok_scores = [_score_tokens(qs, qset, e) for e in ENTRIES]
+    scored = [(e, ts + _domain_boost(qflags, tf)) for e, ts, tf in zip(ENTRIES, tok_scores, _TITLE_FLAGS)]
 
     if not scored:
         return []
-    top = scored[:3]
+    # sorted(..., reverse=True)[:3]과 같은 결과 (동점 순서 포함)
+    top = heapq.nlargest(3, scored, key=lambda x: x[1])
     base = top[0][1]
-    TH = 0.45 if _HAS_RAPIDFUZZ else 0.35
     return [(e, s) for e, s in top if s >= TH and s >= base - 0.06]
 
 # ============== 공개 API ==============
@@ -737,13 +929,14 @@ def find_url_answer(query: str) -> Optional[UrlResult]:
         return None
 
     # 섹션 브로드캐스트 감지
-    qtoks = _canon_tokens(_tokenize(query))
-    sec = _detect_section(qtoks)
-    if sec and _should_broadcast_section(qtoks, sec):
+    qtoks, section_mask = _qtoks(query)
+    qset = frozenset(qtoks)
+    sec = _detect_section(section_mask)
+    if sec and _should_broadcast_section(qset, sec):
         return _render_section_broadcast(sec)
 
     # 일반 매칭
-    cands = _best_candidates(query)
+    cands = _best_candidates(query, qtoks, qset)
     if not cands:
         return None
 
@@ -757,7 +950,7 @@ def find_url_answer(query: str) -> Optional[UrlResult]:
             break
 
     if len(hits) == 1:
-        return UrlResult(html=hits[0].to_html(), hits=hits)
+        return UrlResult(html=hits[0]._rendered_html, hits=hits)
 
     parts = ["원하시는 항목에 가장 가까운 링크들입니다.<br><br><ul>"]
     for e in hits:
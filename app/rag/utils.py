@@ -1,18 +1,51 @@
+import copy
 import json
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Tuple
+
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage
 
 from utils.intent_prompt import INTENT_PROMPT_TEMPLATE
 
+# LLM 의도 분류 결과 캐시: (모델명, temperature, 정규화 질의) → 파싱된 결과
+# - 같은 질문(대소문자/공백만 다른 것 포함)은 OpenAI 왕복 없이 바로 반환
+# - JSON 파싱에 실패한 응답(기본값으로 대체한 경우)은 캐시하지 않음
+_INTENT_CACHE_SIZE = 4096
+_INTENT_CACHE: "OrderedDict[Tuple[Any, Any, str], dict]" = OrderedDict()
+_INTENT_LOCK = threading.Lock()
+_WS = re.compile(r"\s+")
+
+# ▼▼▼▼▼ 시스템 메시지를 한국어로 수정 ▼▼▼▼▼
+# 고정 지시문은 import 시 한 번만 만들어 재사용 — 매 요청 같은 접두라 OpenAI 서버 측 프롬프트 캐시에 걸림
+_INTENT_SYS = SystemMessage(content=INTENT_PROMPT_TEMPLATE)
+
+
+def _intent_key(q: str, llm_instance: ChatOpenAI) -> Tuple[Any, Any, str]:
+    # id(인스턴스)는 GC 후 다른 LLM에 재사용될 수 있어 결과를 바꾸는 설정값으로 구분
+    model = getattr(llm_instance, "model_name", None) or getattr(llm_instance, "model", None)
+    return model, getattr(llm_instance, "temperature", None), _WS.sub(" ", q.strip().lower())
+
+
 def classify_intent_and_extract_entity(q: str, llm_instance: ChatOpenAI) -> dict:
     """LLM을 사용해 사용자의 의도를 분석하고 프로그램 이름을 추출합니다."""
-
-    # ▼▼▼▼▼ 시스템 메시지를 한국어로 수정 ▼▼▼▼▼
-    intent_prompt = SystemMessage(content=INTENT_PROMPT_TEMPLATE)
+    key = _intent_key(q, llm_instance)
+    with _INTENT_LOCK:
+        hit = _INTENT_CACHE.get(key)
+        if hit is not None:
+            _INTENT_CACHE.move_to_end(key)
+            return copy.deepcopy(hit)
 
     try:
-        response = llm_instance.invoke([intent_prompt, HumanMessage(content=q)])
+        response = llm_instance.invoke([_INTENT_SYS, HumanMessage(content=q)])
         result = json.loads(response.content)
-        return result
     except (json.JSONDecodeError, TypeError):
-        return {"intent": "general_question", "program_name": None}
\ No newline at end of file
+        return {"intent": "general_question", "program_name": None}
+
+    with _INTENT_LOCK:
+        _INTENT_CACHE[key] = copy.deepcopy(result)
+        while len(_INTENT_CACHE) > _INTENT_CACHE_SIZE:
+            _INTENT_CACHE.popitem(last=False)
+    return result
@@ -1,13 +1,91 @@
+import asyncio
+import json
+import logging
+import re
+from typing import List, Sequence, Tuple
+
 from langchain_openai import ChatOpenAI
+from langchain_core.messages import SystemMessage, HumanMessage
+
+log = logging.getLogger(__name__)
+
+# 'YES'/'NO'만 필요하므로 출력 토큰을 2개로 제한 (디코딩 시간 ↓)
+_judge = ChatOpenAI(model="gpt-4o-mini", temperature=0.0, max_tokens=2)
+
+# 고정 지시문은 SystemMessage로 한 번만 만들어 재사용 (프롬프트 앞부분이 매번 동일)
+_SYS = SystemMessage(content=(
+    "주어진 Q&A 의 사실 여부를 판단하세요. "
+    "정확하면 'YES', 부정확·모호하면 'NO' 만 출력합니다."
+))
+
+# 여러 쌍을 한 번에: 주어진 순서대로 판정 배열(JSON)만 출력
+_SYS_BATCH = SystemMessage(content=(
+    "주어진 Q&A 들의 사실 여부를 각각 판단하세요. "
+    "정확하면 \"YES\", 부정확·모호하면 \"NO\" 로, 주어진 순서대로 "
+    "JSON 배열(예: [\"YES\", \"NO\"]) 만 출력합니다."
+))
+
 
-_judge = ChatOpenAI(model="gpt-4o-mini", temperature=0.0)
+def _messages(question: str, answer: str) -> list:
+    return [_SYS, HumanMessage(content=f"Q: {question}\nA: {answer}\n판단:")]
 
 
 def fact_check(question: str, answer: str) -> bool:
-    prompt = (
-        "주어진 Q&A 의 사실 여부를 판단하세요. "
-        "정확하면 'YES', 부정확·모호하면 'NO' 만 출력합니다.\n\n"
-        f"Q: {question}\nA: {answer}\n판단:"
-    )
-    verdict = _judge.predict(prompt).strip().upper()   # 문자열 직접 입력
+    verdict = _judge.invoke(_messages(question, answer)).content.strip().upper()
     return verdict.startswith("Y")
+
+
+def _batch_messages(pairs: Sequence[Tuple[str, str]]) -> list:
+    body = "\n\n".join(f"[{i}]\nQ: {q}\nA: {a}" for i, (q, a) in enumerate(pairs, 1))
+    return [_SYS_BATCH, HumanMessage(content=f"{body}\n\n판단(JSON 배열):")]
+
+
+def _batch_judge(n: int):
+    # 항목당 '"YES", ' 4~5토큰 + 공백/줄바꿈·```json 코드 펜스 여유
+    return _judge.bind(max_tokens=8 * n + 16)
+
+
+# 모델이 배열을 ```json ... ``` 로 감싸 보내는 경우
+_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+
+
+def _parse_verdicts(raw: str, n: int):
+    """JSON 배열(코드 펜스 허용) → [bool]; 형식/개수가 맞지 않으면 None"""
+    try:
+        arr = json.loads(_FENCE.sub("", raw))
+    except (json.JSONDecodeError, TypeError):
+        return None
+    if not isinstance(arr, list) or len(arr) != n:
+        return None
+    return [str(v).strip().upper().startswith("Y") for v in arr]
+
+
+def fact_check_batch(pairs: Sequence[Tuple[str, str]]) -> List[bool]:
+    """여러 (질문, 답변)을 요청 한 번으로 판정 — 응답 형식이 어긋나면 쌍마다 fact_check로 대체"""
+    pairs = list(pairs)
+    if len(pairs) <= 1:
+        return [fact_check(q, a) for q, a in pairs]
+    raw = _batch_judge(len(pairs)).invoke(_batch_messages(pairs)).content
+    verdicts = _parse_verdicts(raw, len(pairs))
+    if verdicts is not None:
+        return verdicts
+    log.warning("batch fact check unparsable (%d pairs), falling back per pair: %.200r", len(pairs), raw)
+    return [fact_check(q, a) for q, a in pairs]
+
+
+async def afact_check(question: str, answer: str) -> bool:
+    verdict = (await _judge.ainvoke(_messages(question, answer))).content.strip().upper()
+    return verdict.startswith("Y")
+
+
+async def afact_check_batch(pairs: Sequence[Tuple[str, str]]) -> List[bool]:
+    """fact_check_batch의 비동기 버전 (대체 경로의 쌍별 판정은 동시에 요청)"""
+    pairs = list(pairs)
+    if len(pairs) <= 1:
+        return [await afact_check(q, a) for q, a in pairs]
+    raw = (await _batch_judge(len(pairs)).ainvoke(_batch_messages(pairs))).content
+    verdicts = _parse_verdicts(raw, len(pairs))
+    if verdicts is not None:
+        return verdicts
+    log.warning("batch fact check unparsable (%d pairs), falling back per pair: %.200r", len(pairs), raw)
+    return list(await asyncio.gather(*(afact_check(q, a) for q, a in pairs)))
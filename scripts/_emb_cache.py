@@ -0,0 +1,77 @@
+# scripts/_emb_cache.py
+# 청크 임베딩 디스크 캐시 (내용 주소: sha256(모델ID + 청크 텍스트))
+# - 재빌드 때 바뀌지 않은 청크는 다시 임베딩하지 않음 → 누락분만 한 번에 배치 임베딩
+# - 값은 float32 벡터 바이트 (lz4 있으면 압축)
+from __future__ import annotations
+import dbm
+import hashlib
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+try:
+    import lz4.frame as _lz4  # type: ignore
+    _HAS_LZ4 = True
+except Exception:
+    _HAS_LZ4 = False
+
+try:
+    from app.config import EMB_CACHE_PATH as _EMB_CACHE_PATH
+except Exception:
+    _EMB_CACHE_PATH = "app/data/emb_cache"
+
+EMB_CACHE_PATH = Path(_EMB_CACHE_PATH)
+
+# 값 앞 1바이트: 압축 여부 (lz4 유무가 바뀌어도 기존 캐시를 읽을 수 있게)
+_RAW, _LZ4 = b"R", b"L"
+
+
+def _key(model_id: str, text: str) -> bytes:
+    return hashlib.sha256((model_id + "\x1f" + text).encode("utf-8")).digest()
+
+
+def _pack(vec: np.ndarray) -> bytes:
+    raw = np.asarray(vec, dtype=np.float32).tobytes()
+    return _LZ4 + _lz4.compress(raw) if _HAS_LZ4 else _RAW + raw
+
+
+def _unpack(val: bytes) -> np.ndarray:
+    tag, body = val[:1], val[1:]
+    if tag == _LZ4:
+        body = _lz4.decompress(body)
+    return np.frombuffer(body, dtype=np.float32)
+
+
+def get_or_compute(texts: List[str], embedder, model_id: str) -> np.ndarray:
+    """texts 순서대로 (N, d) float32 임베딩. 캐시에 없는 것만 embedder.embed_documents로 한 번에 계산"""
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    EMB_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    keys = [_key(model_id, t) for t in texts]
+    out: List[np.ndarray] = [None] * len(texts)  # type: ignore[list-item]
+
+    with dbm.open(str(EMB_CACHE_PATH), "c") as db:
+        # 캐시에 없는 키 → 그 키를 쓰는 위치들 (같은 청크가 여러 번 나와도 한 번만 임베딩)
+        misses: Dict[bytes, List[int]] = {}
+        for i, k in enumerate(keys):
+            if k in misses:
+                misses[k].append(i)
+                continue
+            val = db.get(k)
+            if val is None:
+                misses[k] = [i]
+            else:
+                out[i] = _unpack(val)
+
+        if misses:
+            vecs = embedder.embed_documents([texts[idx[0]] for idx in misses.values()])
+            for (k, idx), v in zip(misses.items(), vecs):
+                arr = np.asarray(v, dtype=np.float32)
+                for i in idx:
+                    out[i] = arr
+                db[k] = _pack(arr)
+
+    print(f"ℹ️ 임베딩 캐시: hit={len(texts) - sum(map(len, misses.values()))}, miss={len(misses)} ({EMB_CACHE_PATH})")
+    return np.vstack(out)
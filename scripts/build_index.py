@@ -1,13 +1,19 @@
 # app/rag/build_index.py
 from __future__ import annotations
-import json, re
+import json, os, re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 
+import faiss  # type: ignore
+import numpy as np
 from langchain_community.vectorstores import FAISS
-from langchain.schema import Document
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from app.rag.embeddings import get_embedder
+from app.rag.embeddings import get_embedder, embedder_id
+from app.rag.retriever import set_faiss_threads
+from scripts._emb_cache import get_or_compute
+from scripts.quantize_index import build_sq_index, quant_type
 
 try:
     from app.config import CLEAN_DIR as _CLEAN_DIR
@@ -21,35 +27,49 @@ except Exception:
 CLEAN_DIR = Path(_CLEAN_DIR)
 INDEX_DIR = Path(_INDEX_DIR)
 
+try:
+    from app.config import HNSW_MIN_DOCS, HNSW_M
+except Exception:
+    HNSW_MIN_DOCS, HNSW_M = 20000, 32
+try:
+    from app.config import FAISS_QUANT
+except Exception:
+    FAISS_QUANT = "none"
+try:
+    from app.config import FAISS_ANN, IVF_NLIST, PQ_M
+except Exception:
+    FAISS_ANN, IVF_NLIST, PQ_M = "hnsw", 0, 16
+
 _HDR_LINE   = re.compile(r"^(#{1,6})\s+(.*)$", re.MULTILINE)
 _SOURCE_ROW = re.compile(r"^>\s*Source:\s*(.+)$", re.MULTILINE)
 
+# 줄 머리 헤더: 앞의 \n을 리터럴 접두로 두어 finditer가 '\n#' 위치로 바로 건너뜀 (\s 대신 [^\S\n]로 줄을 넘지 않게)
+_HDR_AFTER_NL = re.compile(r"\n(#{1,6})[^\S\n]+(.*)")
+# str.splitlines()가 줄 경계로 보는 \n 외 문자
+_LINE_BREAKS = ("\r", "\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029")
+
 def split_markdown_sections(md_text: str) -> List[Tuple[str, str]]:
-    lines = md_text.splitlines()
+    # 헤더 위치만 finditer로 찾고 그 사이를 잘라 본문으로 (줄 단위 match 루프 대신)
+    text = md_text
+    if any(c in text for c in _LINE_BREAKS):
+        text = "\n".join(text.splitlines())
+    text = "\n" + text  # 첫 줄 헤더도 '\n#'으로 찾히도록
     sections: List[Tuple[str, str]] = []
     stack: List[Tuple[int, str]] = []
-    buf: List[str] = []
     current_path = ""
+    pos = 0
 
-    def push():
-        if buf:
-            sections.append((current_path.strip(), "\n".join(buf).strip()))
-            buf.clear()
-
-    for line in lines:
-        m = _HDR_LINE.match(line)
-        if not m:
-            buf.append(line); continue
-        push()
+    for m in _HDR_AFTER_NL.finditer(text):
+        sections.append((current_path.strip(), text[pos:m.start()].strip()))
         level = len(m.group(1))
-        text  = m.group(2).strip()
         while stack and stack[-1][0] >= level:
             stack.pop()
-        stack.append((level, text))
+        stack.append((level, m.group(2).strip()))
         current_path = " > ".join([t for _, t in stack])
+        pos = m.end()
 
-    push()
-    sections = [(h, t) for h, t in sections if t.strip()]
+    sections.append((current_path.strip(), text[pos:].strip()))
+    sections = [(h, t) for h, t in sections if t]
     return sections or [("", md_text.strip())]
 
 def first_heading(md_text: str) -> Optional[str]:
@@ -60,55 +80,140 @@ def extract_source_url_from_md(md_text: str) -> Optional[str]:
     m = _SOURCE_ROW.search(md_text)
     return m.group(1).strip() if m else None
 
-def iter_markdowns() -> List[Tuple[Path, str, str, str]]:
-    items: List[Tuple[Path, str, str, str]] = []
-    for md in CLEAN_DIR.glob("**/*.md"):
-        if md.name.lower() == "readme.md": 
+_READ_WORKERS = 32  # 파일 읽기는 I/O 대기라 스레드로 겹침
+
+def _load_md(md: Path) -> Tuple[Path, str, str, str, str]:
+    try:
+        category = md.parents[1].name
+    except Exception:
+        category = md.parent.name
+    text = md.read_text(encoding="utf-8", errors="ignore")
+    title = first_heading(text) or md.stem
+    url = extract_source_url_from_md(text) or ""
+    return md, category, title, url, text
+
+def _read_ocr(txt: Path) -> str:
+    try:
+        return txt.read_text(encoding="utf-8", errors="ignore").strip()
+    except Exception:
+        return ""
+
+def iter_markdowns() -> List[Tuple[Path, str, str, str, str]]:
+    """(경로, 카테고리, 제목, 원본 URL, 본문) — 본문도 함께 돌려줘 build에서 다시 읽지 않음"""
+    paths = [md for md in CLEAN_DIR.glob("**/*.md") if md.name.lower() != "readme.md"]
+    with ThreadPoolExecutor(_READ_WORKERS) as ex:
+        return list(ex.map(_load_md, paths))
+
+def _read_ocr_dir(img_dir: Path) -> List[Tuple[Path, str]]:
+    txts = list(img_dir.glob("**/*.txt"))
+    with ThreadPoolExecutor(_READ_WORKERS) as ex:
+        return list(zip(txts, ex.map(_read_ocr, txts)))
+
+def _build_ivfpq(vecs: np.ndarray):
+    """IVF(거친 군집) + PQ(벡터를 m개 8bit 코드로) 내적 인덱스 — 벡터당 m바이트, 검색은 nprobe개 군집만"""
+    n, d = vecs.shape
+    nlist = IVF_NLIST or max(1, min(int(4 * np.sqrt(n)), n // 39))  # 군집당 학습 표본 39개 이상
+    m = max(k for k in range(1, min(PQ_M, d) + 1) if d % k == 0)    # m은 d의 약수여야 함
+    quantizer = faiss.IndexFlatIP(d)
+    index = faiss.IndexIVFPQ(quantizer, d, nlist, m, 8, faiss.METRIC_INNER_PRODUCT)
+    index.train(vecs)
+    index.add(vecs)
+    index.make_direct_map()  # 리트리버 MMR이 결과 벡터를 reconstruct로 다시 꺼냄 — IVF는 direct map이 있어야 가능
+    return index  # quantizer 참조는 faiss 파이썬 래퍼가 index에 붙들어 둠
+
+_TOKENIZE_BATCH = 4096
+
+def _fit_token_limit(texts: List[str], metas: List[Dict[str, str]], emb) -> Tuple[List[str], List[Dict[str, str]]]:
+    """임베더 최대 토큰(max_seq_length)을 넘는 청크만 토큰 기준으로 다시 나눔
+    - 글자 기준 800자 청크도 한국어는 512토큰을 넘을 수 있고, 넘는 뒷부분은 임베딩에서 조용히 잘림
+    - 길이는 fast tokenizer로 배치 계산(Rust) → 넘는 청크만 '[제목 · 섹션]' 머리를 유지한 채 분할"""
+    client = getattr(emb, "client", emb)  # HuggingFaceEmbeddings면 SentenceTransformer, ONNX 임베더는 자기 자신
+    tok = getattr(client, "tokenizer", None)
+    limit = getattr(client, "max_seq_length", None)
+    if tok is None or not limit or not texts:
+        return texts, metas
+
+    lens: List[int] = []
+    for i in range(0, len(texts), _TOKENIZE_BATCH):
+        enc = tok(texts[i:i + _TOKENIZE_BATCH], add_special_tokens=True, return_length=True, verbose=False)
+        lens.extend(enc["length"])
+
+    out_texts: List[str] = []
+    out_metas: List[Dict[str, str]] = []
+    nsplit = 0
+    for text, meta, n in zip(texts, metas, lens):
+        if n <= limit:
+            out_texts.append(text)
+            out_metas.append(meta)
             continue
-        try:
-            category = md.parents[1].name
-        except Exception:
-            category = md.parent.name
-        text = md.read_text(encoding="utf-8", errors="ignore")
-        title = first_heading(text) or md.stem
-        url = extract_source_url_from_md(text) or ""
-        items.append((md, category, title, url))
-    return items
+        nsplit += 1
+        head, _, body = text.partition("\n")
+        # 머리/특수 토큰 몫을 빼고, 토큰 경계 차이를 감안해 약간 여유
+        budget = max(64, limit - len(tok(head + "\n", add_special_tokens=True)["input_ids"]) - 8)
+        splitter = RecursiveCharacterTextSplitter.from_huggingface_tokenizer(
+            tok, separators=["\n\n", "\n", " ", ""], chunk_size=budget, chunk_overlap=budget // 8
+        )
+        for piece in splitter.split_text(body):
+            out_texts.append(f"{head}\n{piece}")
+            out_metas.append(meta)
+    if nsplit:
+        print(f"ℹ️ 최대 토큰({limit}) 초과 청크 {nsplit}개 재분할 → 청크 {len(texts)} → {len(out_texts)}")
+    return out_texts, out_metas
+
+_SPLITTER = RecursiveCharacterTextSplitter(
+    separators=["\n### ", "\n## ", "\n# ", "\n\n", "\n", " "],
+    chunk_size=800, chunk_overlap=120
+)
+_CHUNK_PROCS_MIN = 64  # md가 이보다 적으면 프로세스 기동 비용이 더 커서 그냥 순차 처리
+
+def _chunk_md(item: Tuple[Path, str, str, str, str]) -> Tuple[List[str], List[Dict[str, str]]]:
+    """md 하나 → (청크 본문, 메타) — 프로세스 풀에서 돌도록 모듈 수준 함수"""
+    md_path, category, title, url, raw = item
+    texts: List[str] = []
+    metas: List[Dict[str, str]] = []
+    for heading_path, text in split_markdown_sections(raw):
+        for ch in _SPLITTER.split_text(text):
+            meta = {
+                "source": str(md_path),
+                "category": category,
+                "title": title,
+                "section": heading_path,
+                "url": url,
+            }
+            texts.append(f"[{title}{(' · ' + heading_path) if heading_path else ''}]\n{ch}")
+            metas.append(meta)
+    return texts, metas
+
+def _chunk_all(items: List[Tuple[Path, str, str, str, str]]) -> List[Tuple[List[str], List[Dict[str, str]]]]:
+    """섹션 분할 + 청크 분할(순수 파이썬, CPU)을 md 단위로 여러 프로세스에 나눔 — 결과 순서는 items 그대로
+    임베딩은 메인 프로세스에서 (GPU/모델은 한 번만 로드)"""
+    workers = os.cpu_count() or 1
+    if workers < 2 or len(items) < _CHUNK_PROCS_MIN:
+        return [_chunk_md(it) for it in items]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        return list(ex.map(_chunk_md, items, chunksize=8))
 
 def build():
     items = iter_markdowns()
     if not items:
         raise RuntimeError(f"❗ 인덱싱할 md가 없습니다: {CLEAN_DIR}/**/*.md")
 
-    splitter = RecursiveCharacterTextSplitter(
-        separators=["\n### ", "\n## ", "\n# ", "\n\n", "\n", " "],
-        chunk_size=800, chunk_overlap=120
-    )
+    # images 폴더별 OCR 사이드카 (경로, 내용) — 같은 폴더를 md마다 다시 읽지 않도록
+    ocr_by_dir: Dict[Path, List[Tuple[Path, str]]] = {}
 
-    docs: List[Document] = []
-    for md_path, category, title, url in items:
-        raw = md_path.read_text(encoding="utf-8", errors="ignore")
-        sections = split_markdown_sections(raw)
-        for heading_path, text in sections:
-            for ch in splitter.split_text(text):
-                meta = {
-                    "source": str(md_path),
-                    "category": category,
-                    "title": title,
-                    "section": heading_path,
-                    "url": url,
-                }
-                payload = f"[{title}{(' · ' + heading_path) if heading_path else ''}]\n{ch}"
-                docs.append(Document(page_content=payload, metadata=meta))
+    # Document 객체 없이 본문/메타만 평평한 리스트로 모음 (임베딩 후 from_embeddings에 바로 넘김)
+    texts: List[str] = []
+    metas: List[Dict[str, str]] = []
+    for (md_path, category, title, url, _), (md_texts, md_metas) in zip(items, _chunk_all(items)):
+        texts.extend(md_texts)
+        metas.extend(md_metas)
 
         # OCR 사이드카(.txt)가 있고, md에 붙이지 않았다면 별도 문서로 인덱스
         img_dir = md_path.parents[1] / "images"
         if img_dir.exists():
-            for txt in img_dir.glob("**/*.txt"):
-                try:
-                    ocr_txt = txt.read_text(encoding="utf-8", errors="ignore").strip()
-                except Exception:
-                    ocr_txt = ""
+            if img_dir not in ocr_by_dir:
+                ocr_by_dir[img_dir] = _read_ocr_dir(img_dir)
+            for txt, ocr_txt in ocr_by_dir[img_dir]:
                 if not ocr_txt:
                     continue
                 meta = {
@@ -118,12 +223,43 @@ def build():
                     "section": txt.name,
                     "url": url,
                 }
-                docs.append(Document(page_content=f"[{title} · OCR]\n{ocr_txt}", metadata=meta))
+                texts.append(f"[{title} · OCR]\n{ocr_txt}")
+                metas.append(meta)
 
     INDEX_DIR.mkdir(parents=True, exist_ok=True)
-    vs = FAISS.from_documents(docs, get_embedder())
+    # 전체 청크를 한 번에 배치 임베딩한 뒤 벡터를 그대로 넘김 (바뀌지 않은 청크는 디스크 캐시에서)
+    emb = get_embedder()
+    texts, metas = _fit_token_limit(texts, metas, emb)
+    vecs = np.ascontiguousarray(get_or_compute(texts, emb, embedder_id()), dtype=np.float32)
+    # 정규화 벡터 + 내적(IP) = 코사인 (L2 거리와 순위는 같고 연산이 한 단계 적음)
+    set_faiss_threads()
+    faiss.normalize_L2(vecs)
+    vs = FAISS.from_embeddings(
+        zip(texts, vecs), emb,
+        metadatas=metas,
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+    )
+    # 청크가 많으면 전수 검색 대신 근사 인덱스로 교체 — 벡터/순서는 그대로
+    # - FAISS_ANN=hnsw(기본): HNSW 그래프(O(log n)) / ivfpq: IVF+PQ(벡터당 PQ_M바이트, 메모리 최소)
+    # FAISS_QUANT=int8|fp16이면 벡터를 스칼라 양자화해 저장 (메모리/디스크 1/4·1/2, 스캔 대역폭도 같은 비율)
+    qtype = quant_type(FAISS_QUANT)
+    if len(texts) > HNSW_MIN_DOCS and FAISS_ANN == "ivfpq":
+        vs.index = _build_ivfpq(vecs)
+        print(f"ℹ️ IVFPQ 인덱스 사용 (docs={len(texts)}, nlist={vs.index.nlist}, m={vs.index.pq.M})")
+    elif len(texts) > HNSW_MIN_DOCS:
+        if qtype is None:
+            hnsw = faiss.IndexHNSWFlat(vecs.shape[1], HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        else:
+            hnsw = faiss.IndexHNSWSQ(vecs.shape[1], qtype, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            hnsw.train(vecs)
+        hnsw.add(vecs)
+        vs.index = hnsw
+        print(f"ℹ️ HNSW 인덱스 사용 (docs={len(texts)}, M={HNSW_M}, quant={FAISS_QUANT})")
+    elif qtype is not None:
+        vs.index = build_sq_index(vecs, faiss.METRIC_INNER_PRODUCT, qtype)
+        print(f"ℹ️ SQ({FAISS_QUANT}) 인덱스 사용 (docs={len(texts)})")
     vs.save_local(str(INDEX_DIR))
-    print(f"✅ 인덱스 저장 완료: {INDEX_DIR} (docs={len(docs)})")
+    print(f"✅ 인덱스 저장 완료: {INDEX_DIR} (docs={len(texts)})")
 
 if __name__ == "__main__":
     build()
@@ -0,0 +1,38 @@
+# scripts/quantize_embedder.py
+# 임베딩 모델(EMBED_MODEL_ID)을 ONNX로 내보내고 동적 INT8(AVX512-VNNI) 양자화
+# - 결과 디렉터리를 EMBED_ONNX_DIR로 지정하면 get_embedder가 onnxruntime(CPU)으로 사용
+# - 벡터가 FP32 모델과 조금 달라지므로 지정 후에는 build_index로 인덱스를 다시 만들 것
+# 사용: python -m scripts.quantize_embedder [출력 디렉터리]  (optimum[onnxruntime] 필요)
+from __future__ import annotations
+import sys
+from pathlib import Path
+
+from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer  # type: ignore
+from optimum.onnxruntime.configuration import AutoQuantizationConfig  # type: ignore
+from transformers import AutoTokenizer  # type: ignore
+
+try:
+    from app.config import EMBED_MODEL_ID
+except Exception:
+    EMBED_MODEL_ID = "intfloat/e5-large-v2"
+
+DEFAULT_OUT = "app/data/embedder_onnx"
+
+
+def quantize(out_dir: str = DEFAULT_OUT):
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    # 1) feature-extraction ONNX 내보내기 (+ 토크나이저 동봉)
+    model = ORTModelForFeatureExtraction.from_pretrained(EMBED_MODEL_ID, export=True)
+    model.save_pretrained(out)
+    AutoTokenizer.from_pretrained(EMBED_MODEL_ID).save_pretrained(out)
+
+    # 2) 동적 INT8 양자화 → model_quantized.onnx
+    qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+    ORTQuantizer.from_pretrained(model).quantize(save_dir=out, quantization_config=qconfig)
+    print(f"✅ INT8 ONNX 임베더 저장 완료: {out} (EMBED_ONNX_DIR={out} 로 사용)")
+
+
+if __name__ == "__main__":
+    quantize(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_OUT)
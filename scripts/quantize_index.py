@@ -0,0 +1,77 @@
+# scripts/quantize_index.py
+# 기존 FP32 Flat FAISS 인덱스를 스칼라 양자화(SQ) 인덱스로 변환 (int8: 벡터당 바이트 1/4, fp16: 1/2)
+# - docstore(index.pkl)와 id 순서는 그대로라 get_vectorstore가 그대로 읽는다
+# - 리랭커가 후보를 다시 채점하므로 양자화로 인한 recall 손실은 대부분 흡수됨
+# 사용: python -m scripts.quantize_index [int8|fp16]  (build_index 실행 후, 기본 int8)
+#       빌드 때 바로 양자화하려면 FAISS_QUANT=int8|fp16
+from __future__ import annotations
+import shutil
+import sys
+from pathlib import Path
+
+import faiss  # type: ignore
+
+try:
+    from app.config import INDEX_DIR as _INDEX_DIR
+except Exception:
+    _INDEX_DIR = "app/data/index.faiss"  # app/config.py 기본값과 같게
+
+INDEX_DIR = Path(_INDEX_DIR)
+
+QUANT_TYPES = {
+    "int8": faiss.ScalarQuantizer.QT_8bit,
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+}
+
+
+def quant_type(kind: str):
+    """'int8' | 'fp16' → ScalarQuantizer 타입, 'none'/빈 값이면 None"""
+    kind = (kind or "none").strip().lower()
+    if kind == "none":
+        return None
+    if kind not in QUANT_TYPES:
+        raise ValueError(f"❗ 알 수 없는 양자화 방식: {kind} (int8 | fp16 | none)")
+    return QUANT_TYPES[kind]
+
+
+def build_sq_index(xb, metric, qtype):
+    """(N, d) float32 벡터로 학습·추가까지 끝낸 IndexScalarQuantizer"""
+    sq = faiss.IndexScalarQuantizer(xb.shape[1], qtype, metric)
+    sq.train(xb)
+    sq.add(xb)
+    return sq
+
+
+def quantize(kind: str = "int8"):
+    qtype = quant_type(kind)
+    if qtype is None:
+        return
+    path = INDEX_DIR / "index.faiss"
+    if not path.exists():
+        raise RuntimeError(f"❗ 인덱스가 없습니다: {path} (먼저 scripts/build_index.py 실행)")
+
+    flat = faiss.read_index(str(path))
+    if isinstance(flat, faiss.IndexScalarQuantizer):
+        print(f"ℹ️ 이미 양자화된 인덱스입니다: {path}")
+        return
+    if isinstance(flat, faiss.IndexHNSW):
+        print(f"ℹ️ HNSW 인덱스는 변환하지 않습니다(그래프가 사라짐): {path}")
+        return
+    if isinstance(flat, faiss.IndexIVF):
+        print(f"ℹ️ IVF 인덱스는 변환하지 않습니다(이미 압축/군집 구조): {path}")
+        return
+    if flat.ntotal == 0:
+        raise RuntimeError(f"❗ 빈 인덱스입니다: {path}")
+
+    sq = build_sq_index(flat.reconstruct_n(0, flat.ntotal), flat.metric_type, qtype)
+
+    # 원본은 index.flat.faiss로 남겨 둠 (되돌리려면 파일명만 바꾸면 됨)
+    shutil.copy2(path, INDEX_DIR / "index.flat.faiss")
+    tmp = path.with_suffix(".faiss.tmp")
+    faiss.write_index(sq, str(tmp))
+    tmp.replace(path)
+    print(f"✅ SQ({kind}) 인덱스 저장 완료: {path} (vectors={sq.ntotal}, dim={sq.d})")
+
+
+if __name__ == "__main__":
+    quantize(sys.argv[1] if len(sys.argv) > 1 else "int8")